@@ -13,29 +13,128 @@ import os
 import asyncio
 import logging
 import json
+import re
 import shutil
+from collections import Counter
+from dataclasses import asdict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 import subprocess
 import tempfile
+import time
 
 from pyhc_gallery_scraper import DocumentationScraper, CodeExample
-from llm_processor import BatchProcessor, ProcessingResult
+from llm_processor import BatchProcessor, ClaudeExampleProcessor, ProcessingResult, ResultCache
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Title keywords that mark an example as showing new functionality
+_NEW_FUNCTIONALITY_KEYWORDS = frozenset({'new', 'latest', '2024', '2023'})
+
+# Common PyHC packages that should be included in the gallery requirements
+_COMMON_PACKAGES = frozenset({
+    'sunpy', 'plasmapy', 'pyspedas', 'spacepy', 'pysat',
+    'astropy', 'numpy', 'matplotlib', 'scipy'
+})
+
+
+class _SanitizeTable(dict):
+    """str.translate table for filenames, filled in lazily per character
+    
+    ASCII letters and digits are kept, whitespace becomes '_' and everything
+    else is dropped.
+    """
+    
+    def __missing__(self, codepoint: int) -> Optional[str]:
+        char = chr(codepoint)
+        if char.isascii() and char.isalnum():
+            value = char
+        elif char.isspace():
+            value = '_'
+        else:
+            value = None
+        self[codepoint] = value
+        return value
+
+
+_SANITIZE_TABLE = _SanitizeTable()
+_UNDERSCORE_RUNS = re.compile(r'_+')
+
+# Separates a requirement's package name from its version specifier/markers
+_REQ_SPLIT = re.compile(r'[<>=!~;\s]')
+
+
+def _write_file(path: Path, content: str):
+    """Write text to a file (run via asyncio.to_thread to keep the loop free)"""
+    path.write_text(content, encoding='utf-8')
+
+
+def _append_file(path: Path, content: str):
+    """Append text to a file (run via asyncio.to_thread to keep the loop free)"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(content)
+
+
+def _dumps_json(data: Any) -> bytes:
+    """Serialize data as indented JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+def _env_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    """Read an integer setting from the environment"""
+    value = os.getenv(name)
+    return int(value) if value else default
 
 
 class GitHubIntegration:
-    """Handle GitHub repository operations"""
+    """Handle GitHub repository operations
+
+    Uses an in-process libgit2 handle (pygit2) when available so that clone,
+    branch and commit share one repository object instead of spawning a
+    ``git`` subprocess per operation. Falls back to the git CLI otherwise.
+    """
     
     def __init__(self, repo_url: str = "https://github.com/heliophysicsPy/gallery.git"):
         self.repo_url = repo_url
         self.logger = logging.getLogger(__name__)
+        self._repo = None
+    
+    def _open_repo(self, repo_dir: str):
+        """Return the cached pygit2 repository handle, opening it if needed"""
+        if self._repo is None:
+            self._repo = pygit2.Repository(repo_dir)
+        return self._repo
     
     def clone_gallery_repo(self, target_dir: str) -> bool:
-        """Clone the gallery repository"""
+        """Clone the gallery repository
+
+        Only the tip of the default branch is needed to add new examples on
+        top of it, so the clone is shallow and single-branch.
+        """
+        if pygit2 is not None:
+            try:
+                self._repo = pygit2.clone_repository(self.repo_url, target_dir, depth=1)
+                self.logger.info(f"Successfully cloned repository to {target_dir}")
+                return True
+            except Exception as e:
+                self.logger.error(f"Failed to clone repository: {e}")
+                return False
+        
         try:
-            cmd = ['git', 'clone', self.repo_url, target_dir]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            cmd = ['git', 'clone', '--depth', '1', '--single-branch', self.repo_url, target_dir]
+            result = subprocess.run(cmd, capture_output=True, text=True, check=False)
             
             if result.returncode == 0:
                 self.logger.info(f"Successfully cloned repository to {target_dir}")
@@ -49,17 +148,21 @@ class GitHubIntegration:
     
     def create_update_branch(self, repo_dir: str, branch_name: str) -> bool:
         """Create a new branch for updates"""
+        if pygit2 is not None:
+            try:
+                repo = self._open_repo(repo_dir)
+                branch = repo.branches.local.create(branch_name, repo.head.peel(pygit2.Commit))
+                repo.checkout(branch)
+                self.logger.info(f"Created branch: {branch_name}")
+                return True
+            except Exception as e:
+                self.logger.error(f"Failed to create branch: {e}")
+                return False
+        
         try:
-            # Change to repo directory
-            original_cwd = os.getcwd()
-            os.chdir(repo_dir)
-            
             # Create and checkout new branch
             cmd = ['git', 'checkout', '-b', branch_name]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            # Return to original directory
-            os.chdir(original_cwd)
+            result = subprocess.run(cmd, cwd=repo_dir, capture_output=True, text=True, check=False)
             
             if result.returncode == 0:
                 self.logger.info(f"Created branch: {branch_name}")
@@ -71,20 +174,48 @@ class GitHubIntegration:
             self.logger.error(f"Exception creating branch: {e}")
             return False
     
-    def commit_changes(self, repo_dir: str, message: str) -> bool:
-        """Commit changes to the repository"""
+    def commit_changes(self, repo_dir: str, message: str,
+                       changed_paths: Optional[List[str]] = None) -> bool:
+        """Commit changes to the repository
+        
+        Only changed_paths (relative to repo_dir) are staged when given, which
+        avoids rescanning the whole worktree; otherwise all changes are staged.
+        """
+        if pygit2 is not None:
+            try:
+                repo = self._open_repo(repo_dir)
+                
+                # Stage changes and write the tree in-process
+                if changed_paths is None:
+                    repo.index.add_all()
+                else:
+                    for path in changed_paths:
+                        repo.index.add(path)
+                repo.index.write()
+                tree = repo.index.write_tree()
+                
+                parent = repo.head.peel(pygit2.Commit)
+                if tree == parent.tree_id:
+                    self.logger.warning("Commit failed or no changes: nothing to commit")
+                    return False
+                
+                author = repo.default_signature
+                repo.create_commit('HEAD', author, author, message, tree, [parent.id])
+                self.logger.info("Successfully committed changes")
+                return True
+            except Exception as e:
+                self.logger.error(f"Exception during commit: {e}")
+                return False
+        
         try:
-            original_cwd = os.getcwd()
-            os.chdir(repo_dir)
-            
-            # Add all changes
-            subprocess.run(['git', 'add', '.'], check=True)
+            # Stage changes (new example files are untracked, so
+            # `git commit -a` alone would miss them)
+            add_cmd = ['git', 'add', '--'] + (changed_paths if changed_paths is not None else ['.'])
+            subprocess.run(add_cmd, cwd=repo_dir, check=True)
             
             # Commit changes
             cmd = ['git', 'commit', '-m', message]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            os.chdir(original_cwd)
+            result = subprocess.run(cmd, cwd=repo_dir, capture_output=True, text=True, check=False)
             
             if result.returncode == 0:
                 self.logger.info("Successfully committed changes")
@@ -103,15 +234,32 @@ class WorkflowManager:
     def __init__(self, 
                  anthropic_api_key: Optional[str] = None,
                  github_token: Optional[str] = None,
-                 dry_run: bool = True):
+                 dry_run: bool = True,
+                 cache_dir: Optional[str] = None,
+                 force_reprocess: bool = False):
         self.anthropic_api_key = anthropic_api_key or os.getenv('ANTHROPIC_API_KEY')
         self.github_token = github_token or os.getenv('GITHUB_TOKEN')
         self.dry_run = dry_run
+        self.force_reprocess = force_reprocess
         self.logger = self._setup_logging()
         
         # Create work directory
         self.work_dir = Path(tempfile.mkdtemp(prefix='pyhc_gallery_'))
         self.logger.info(f"Work directory: {self.work_dir}")
+        
+        # Caches outlive the work directory so later runs can reuse them
+        self.cache_dir = Path(
+            cache_dir or os.getenv('PYHC_GALLERY_CACHE_DIR')
+            or Path(tempfile.gettempdir()) / 'pyhc_gallery_cache'
+        )
+        
+        self._set_run_time()
+    
+    def _set_run_time(self):
+        """Capture the run's timestamp once so every step agrees on it"""
+        self._now = datetime.now()
+        self._date_str = self._now.strftime('%Y%m%d')
+        self._date_iso = self._now.strftime('%Y-%m-%d')
     
     def _setup_logging(self):
         logging.basicConfig(
@@ -127,45 +275,45 @@ class WorkflowManager:
     async def run_weekly_update(self) -> bool:
         """Run the complete weekly update workflow"""
         self.logger.info("Starting weekly PyHC Gallery update workflow")
+        self._set_run_time()
         
         try:
-            # Step 1: Scrape examples from documentation
-            self.logger.info("Step 1: Scraping examples from PyHC packages")
-            scraped_examples = await self._scrape_examples()
+            # Step 1: Scrape examples and clone the gallery repository.
+            # Both are network-bound and independent, so run them together.
+            self.logger.info("Step 1: Scraping examples from PyHC packages and cloning gallery repository")
+            repo_dir = self.work_dir / "gallery"
+            github_integration = GitHubIntegration()
+            
+            scraped_examples, cloned = await asyncio.gather(
+                self._scrape_examples(),
+                asyncio.to_thread(github_integration.clone_gallery_repo, str(repo_dir))
+            )
             
             if not scraped_examples:
                 self.logger.warning("No examples scraped - aborting workflow")
                 return False
             
-            # Step 2: Process examples with LLM
-            self.logger.info("Step 2: Processing examples with LLM")
-            processed_results = await self._process_examples(scraped_examples)
-            
-            # Step 3: Clone gallery repository
-            self.logger.info("Step 3: Cloning gallery repository")
-            repo_dir = self.work_dir / "gallery"
-            github_integration = GitHubIntegration()
-            
-            if not github_integration.clone_gallery_repo(str(repo_dir)):
+            if not cloned:
                 self.logger.error("Failed to clone repository")
                 return False
             
-            # Step 4: Update gallery files
-            self.logger.info("Step 4: Updating gallery files")
-            updated_files = await self._update_gallery_files(
-                processed_results, scraped_examples, repo_dir
+            # Step 2: Process examples with LLM, updating gallery files as
+            # each result arrives
+            self.logger.info("Step 2: Processing examples with LLM and updating gallery files")
+            processed_results, updated_files = await self._update_gallery_files(
+                self._stream_results(scraped_examples), scraped_examples, repo_dir
             )
             
-            # Step 5: Create pull request (if not dry run)
+            # Step 3: Create pull request (if not dry run)
             if not self.dry_run and updated_files:
-                self.logger.info("Step 5: Creating pull request")
+                self.logger.info("Step 3: Creating pull request")
                 await self._create_pull_request(github_integration, repo_dir, updated_files)
             else:
-                self.logger.info("Step 5: Dry run - skipping pull request creation")
+                self.logger.info("Step 3: Dry run - skipping pull request creation")
                 self.logger.info(f"Updated files: {updated_files}")
             
-            # Step 6: Generate summary report
-            self.logger.info("Step 6: Generating summary report")
+            # Step 4: Generate summary report
+            self.logger.info("Step 4: Generating summary report")
             await self._generate_summary_report(scraped_examples, processed_results, updated_files)
             
             self.logger.info("Weekly update workflow completed successfully")
@@ -176,67 +324,103 @@ class WorkflowManager:
             return False
         finally:
             # Cleanup
-            self._cleanup()
+            await self._cleanup()
     
-    async def _scrape_examples(self) -> List[CodeExample]:
-        """Scrape examples from all PyHC packages"""
-        scraper_output_dir = self.work_dir / "scraped"
-        scraper_output_dir.mkdir(exist_ok=True)
+    async def _scrape_examples(self, scraper: Optional[DocumentationScraper] = None) -> List[CodeExample]:
+        """Scrape examples from all PyHC packages
         
-        async with DocumentationScraper(str(scraper_output_dir)) as scraper:
+        An already open scraper can be passed in to reuse its session.
+        """
+        if scraper is not None:
             examples = await scraper.scrape_all_packages()
+        else:
+            scraper_output_dir = self.work_dir / "scraped"
+            scraper_output_dir.mkdir(exist_ok=True)
+            
+            async with DocumentationScraper(str(scraper_output_dir),
+                                            cache_dir=str(self.cache_dir / 'http')) as scraper:
+                examples = await scraper.scrape_all_packages()
             
         self.logger.info(f"Scraped {len(examples)} examples from PyHC packages")
         return examples
     
-    async def _process_examples(self, examples: List[CodeExample]) -> List[ProcessingResult]:
-        """Process examples using LLM"""
+    async def _stream_results(self, examples: List[CodeExample],
+                              max_concurrency: Optional[int] = None,
+                              rpm: Optional[int] = None,
+                              tpm: Optional[int] = None
+                              ) -> AsyncIterator[Tuple[int, ProcessingResult, CodeExample]]:
+        """Process examples using LLM, yielding (index, result, original) as each completes
+        
+        Concurrency and the requests/tokens-per-minute budget default to the
+        LLM_MAX_CONCURRENCY, LLM_RPM and LLM_TPM environment variables.
+        """
         if not self.anthropic_api_key:
             self.logger.warning("No Anthropic API key - skipping LLM processing")
-            return []
+            return
         
         # Convert CodeExample objects to dictionaries for processing
-        example_dicts = []
-        for example in examples:
-            example_dicts.append({
-                'package': example.package,
-                'title': example.title,
-                'description': example.description,
-                'category': example.category,
-                'source_url': example.source_url,
-                'code': example.code
-            })
-        
-        processor = BatchProcessor(self.anthropic_api_key)
-        results = await processor.process_examples(example_dicts)
-        
-        self.logger.info(f"Processed {len(results)} examples with LLM")
-        return results
+        example_dicts = [asdict(example) for example in examples]
+        
+        cache = ResultCache(str(self.cache_dir / 'llm_cache.sqlite'))
+        try:
+            processed = 0
+            async with BatchProcessor(
+                self.anthropic_api_key,
+                max_concurrent=max_concurrency or _env_int('LLM_MAX_CONCURRENCY', 10),
+                rpm=rpm or _env_int('LLM_RPM'),
+                tpm=tpm or _env_int('LLM_TPM'),
+                cache=cache,
+                batch_threshold=_env_int('LLM_BATCH_THRESHOLD', 50) or None,
+                model=os.getenv('LLM_MODEL') or ClaudeExampleProcessor.DEFAULT_MODEL
+            ) as processor:
+                async for i, result in processor.iter_results(
+                    example_dicts, force_reprocess=self.force_reprocess
+                ):
+                    processed += 1
+                    yield i, result, examples[i]
+        finally:
+            cache.close()
+        
+        self.logger.info(f"Processed {processed} examples with LLM")
     
     async def _update_gallery_files(self, 
-                                  processed_results: List[ProcessingResult],
+                                  result_stream: AsyncIterator[Tuple[int, ProcessingResult, CodeExample]],
                                   original_examples: List[CodeExample],
-                                  repo_dir: Path) -> List[str]:
-        """Update files in the gallery repository"""
+                                  repo_dir: Path) -> Tuple[List[ProcessingResult], List[str]]:
+        """Update files in the gallery repository
+        
+        Consumes results as the LLM produces them, so filtering and file
+        writes overlap with requests still in flight. Returns the processed
+        results and the names of the files written.
+        """
+        processed_results = []
         updated_files = []
         gallery_dir = repo_dir / "gallery"
         
         if not gallery_dir.exists():
             self.logger.error(f"Gallery directory not found: {gallery_dir}")
-            return []
-        
-        # Get current date for prefixing new files
-        current_date = datetime.now().strftime("%Y%m%d")
-        
-        # Process each result
-        for i, (result, original) in enumerate(zip(processed_results, original_examples)):
+            return [], []
+        
+        # Count existing gallery files per package once, up front
+        entry_names = [entry.name for entry in gallery_dir.iterdir()]
+        package_counts = Counter({
+            package: sum(package in name for name in entry_names)
+            for package in {example.package for example in original_examples}
+        })
+        
+        # Process each result as it arrives, writing files concurrently in
+        # worker threads
+        write_tasks = []
+        async for i, result, original in result_stream:
+            processed_results.append(result)
+            
             # Generate filename
             package = original.package
             safe_title = self._sanitize_filename(result.improved_title)
-            filename = f"auto_{current_date}_{package}_{i+1:02d}_{safe_title}.py"
+            filename = f"auto_{self._date_str}_{package}_{i+1:02d}_{safe_title}.py"
             
             # Check if this is a significant update
-            if await self._should_update_example(gallery_dir, result, original):
+            if await self._should_update_example(result, original, package_counts):
                 # Create gallery-formatted content
                 from llm_processor import ExampleFormatter
                 content = ExampleFormatter.format_for_gallery(
@@ -245,109 +429,113 @@ class WorkflowManager:
                 
                 # Write file
                 output_path = gallery_dir / filename
-                with open(output_path, 'w') as f:
-                    f.write(content)
+                write_tasks.append(asyncio.create_task(
+                    asyncio.to_thread(_write_file, output_path, content)
+                ))
                 
+                package_counts[package] += 1
                 updated_files.append(filename)
                 self.logger.info(f"Updated: {filename}")
         
+        await asyncio.gather(*write_tasks)
+        
         # Update requirements.txt if needed
         await self._update_requirements(repo_dir, original_examples)
         
         # Update README with generation info
         await self._update_readme(repo_dir, len(updated_files))
         
-        return updated_files
+        return processed_results, updated_files
     
     async def _should_update_example(self, 
-                                   gallery_dir: Path,
                                    result: ProcessingResult,
-                                   original: CodeExample) -> bool:
+                                   original: CodeExample,
+                                   package_counts: Counter) -> bool:
         """Determine if an example should be updated"""
         # Always include if confidence is high
         if result.confidence_score > 0.7:
             return True
         
         # Include if it's a new package we haven't covered
-        package_files = list(gallery_dir.glob(f"*{original.package}*"))
-        if len(package_files) < 2:  # Less than 2 examples from this package
+        if package_counts[original.package] < 2:  # Less than 2 examples from this package
             return True
         
         # Include if it demonstrates new functionality
-        if any(keyword in result.improved_title.lower() 
-               for keyword in ['new', 'latest', '2024', '2023']):
+        title = result.improved_title.lower()
+        if any(keyword in title for keyword in _NEW_FUNCTIONALITY_KEYWORDS):
             return True
         
         return False
     
     async def _update_requirements(self, repo_dir: Path, examples: List[CodeExample]):
         """Update requirements.txt with new dependencies"""
+        # Collect the common packages used by the examples; most runs add
+        # nothing, so skip reading requirements.txt in that case
+        all_deps = set().union(*(example.dependencies for example in examples))
+        candidates = all_deps & _COMMON_PACKAGES
+        if not candidates:
+            return
+        
         requirements_file = repo_dir / "requirements.txt"
         
         if not requirements_file.exists():
             self.logger.warning("requirements.txt not found")
             return
         
-        # Read current requirements
+        # Read the package names already listed
+        current_packages = set()
         with open(requirements_file, 'r') as f:
-            current_reqs = set(line.strip() for line in f if line.strip() and not line.startswith('#'))
-        
-        # Collect all dependencies from examples
-        all_deps = set()
-        for example in examples:
-            all_deps.update(example.dependencies)
-        
-        # Common PyHC packages that should be included
-        common_packages = {
-            'sunpy', 'plasmapy', 'pyspedas', 'spacepy', 'pysat',
-            'astropy', 'numpy', 'matplotlib', 'scipy'
-        }
+            for line in f:
+                req = line.strip()
+                if req and not req.startswith('#'):
+                    current_packages.add(_REQ_SPLIT.split(req, 1)[0])
         
-        new_deps = (all_deps & common_packages) - {req.split('>=')[0].split('==')[0] for req in current_reqs}
+        new_deps = candidates - current_packages
         
         if new_deps:
             self.logger.info(f"Adding new dependencies: {new_deps}")
-            with open(requirements_file, 'a') as f:
-                for dep in sorted(new_deps):
-                    f.write(f"\n{dep}")
+            await asyncio.to_thread(
+                _append_file, requirements_file, ''.join(f"\n{dep}" for dep in sorted(new_deps))
+            )
     
     async def _update_readme(self, repo_dir: Path, num_updated: int):
         """Update README with automation info"""
         readme_file = repo_dir / "gallery" / "README.txt"
         
-        if readme_file.exists():
-            with open(readme_file, 'r') as f:
-                content = f.read()
-            
-            # Add automation notice if not already present
-            automation_notice = f"""
+        try:
+            content = await asyncio.to_thread(readme_file.read_text, encoding='utf-8')
+        except FileNotFoundError:
+            return
+        
+        # Add automation notice if not already present
+        if "Automated Examples" in content:
+            return
+        
+        automation_notice = f"""
 
 # Automated Examples
 Some examples in this gallery are automatically generated from PyHC package
 documentation using the automated scraping system. These examples are prefixed
 with 'auto_' and include the generation date.
 
-Last automated update: {datetime.now().strftime('%Y-%m-%d')}
+Last automated update: {self._date_iso}
 Examples updated in this run: {num_updated}
 """
-            
-            if "Automated Examples" not in content:
-                with open(readme_file, 'a') as f:
-                    f.write(automation_notice)
+        await asyncio.to_thread(_append_file, readme_file, automation_notice)
     
     async def _create_pull_request(self, 
                                  github_integration: GitHubIntegration,
                                  repo_dir: Path,
                                  updated_files: List[str]):
         """Create a pull request with the updates"""
-        branch_name = f"auto-update-{datetime.now().strftime('%Y%m%d')}"
+        branch_name = f"auto-update-{self._date_str}"
         
         # Create branch
         if not github_integration.create_update_branch(str(repo_dir), branch_name):
             return
         
         # Commit changes
-        commit_message = f"""Automated gallery update - {datetime.now().strftime('%Y-%m-%d')}
+        commit_message = f"""Automated gallery update - {self._date_iso}
 
 Added {len(updated_files)} new examples automatically scraped and processed from PyHC package documentation:
 
@@ -357,7 +545,12 @@ Added {len(updated_files)} new examples automatically scraped and processed from
 Generated using automated PyHC gallery scraping system.
 """
         
-        github_integration.commit_changes(str(repo_dir), commit_message)
+        # Stage only the files this run could have touched
+        candidate_paths = [f"gallery/{f}" for f in updated_files]
+        candidate_paths += ["requirements.txt", "gallery/README.txt"]
+        changed_paths = [p for p in candidate_paths if (repo_dir / p).exists()]
+        
+        github_integration.commit_changes(str(repo_dir), commit_message, changed_paths)
         
         # Note: In a real implementation, you would use GitHub API to create the PR
         self.logger.info(f"Created branch {branch_name} with {len(updated_files)} updated files")
@@ -368,33 +561,30 @@ Generated using automated PyHC gallery scraping system.
                                      processed_results: List[ProcessingResult],
                                      updated_files: List[str]):
         """Generate a summary report of the workflow"""
+        # Gather result statistics in a single pass
+        categories = set()
+        warning_counts = Counter()
+        confidence_total = 0.0
+        for result in processed_results:
+            categories.add(result.category)
+            warning_counts.update(result.warnings)
+            confidence_total += result.confidence_score
+        
         report = {
-            "workflow_date": datetime.now().isoformat(),
+            "workflow_date": self._now.isoformat(),
             "total_scraped": len(scraped_examples),
             "total_processed": len(processed_results),
             "total_updated": len(updated_files),
-            "packages_scraped": list(set(ex.package for ex in scraped_examples)),
-            "categories_covered": list(set(res.category for res in processed_results)),
-            "average_confidence": sum(res.confidence_score for res in processed_results) / len(processed_results) if processed_results else 0,
+            "packages_scraped": list({ex.package for ex in scraped_examples}),
+            "categories_covered": list(categories),
+            "average_confidence": confidence_total / len(processed_results) if processed_results else 0,
             "updated_files": updated_files,
-            "warnings_summary": {}
+            "warnings_summary": dict(warning_counts)
         }
         
-        # Collect warnings
-        all_warnings = []
-        for result in processed_results:
-            all_warnings.extend(result.warnings)
-        
-        warning_counts = {}
-        for warning in all_warnings:
-            warning_counts[warning] = warning_counts.get(warning, 0) + 1
-        
-        report["warnings_summary"] = warning_counts
-        
         # Save report
         report_file = self.work_dir / "workflow_summary.json"
-        with open(report_file, 'w') as f:
-            json.dump(report, f, indent=2)
+        await asyncio.to_thread(report_file.write_bytes, _dumps_json(report))
         
         self.logger.info(f"Summary report saved: {report_file}")
         
@@ -402,7 +592,7 @@ Generated using automated PyHC gallery scraping system.
         print("\n" + "="*50)
         print("PYHC GALLERY AUTOMATION SUMMARY")
         print("="*50)
-        print(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Date: {self._now.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"Scraped examples: {report['total_scraped']}")
         print(f"Processed examples: {report['total_processed']}")
         print(f"Updated files: {report['total_updated']}")
@@ -412,14 +602,12 @@ Generated using automated PyHC gallery scraping system.
     
     def _sanitize_filename(self, title: str) -> str:
         """Convert title to safe filename"""
-        import re
-        sanitized = re.sub(r'[^a-zA-Z0-9\s]', '', title)
-        return re.sub(r'\s+', '_', sanitized).lower()[:30]
+        return _UNDERSCORE_RUNS.sub('_', title.translate(_SANITIZE_TABLE)).lower()[:30]
     
-    def _cleanup(self):
-        """Clean up temporary files"""
+    async def _cleanup(self):
+        """Clean up temporary files without blocking the event loop"""
         try:
-            shutil.rmtree(self.work_dir)
+            await asyncio.to_thread(shutil.rmtree, self.work_dir)
             self.logger.info("Cleaned up temporary work directory")
         except Exception as e:
             self.logger.warning(f"Failed to cleanup work directory: {e}")
@@ -434,28 +622,19 @@ class ScheduledRunner:
     def should_run_update(self) -> bool:
         """Determine if update should run (weekly check)"""
         # Check if it's been a week since last run
-        last_run_file = Path("last_run.txt")
-        
-        if not last_run_file.exists():
-            return True
-        
+        # (the file's modification time records the last run)
         try:
-            with open(last_run_file, 'r') as f:
-                last_run_str = f.read().strip()
-            
-            last_run = datetime.fromisoformat(last_run_str)
-            now = datetime.now()
-            
-            # Run if it's been more than 7 days
-            return (now - last_run) > timedelta(days=7)
-        except Exception as e:
-            self.logger.error(f"Error checking last run: {e}")
+            last_run = os.path.getmtime("last_run.txt")
+        except FileNotFoundError:
             return True
+        
+        # Run if it's been more than 7 days
+        return (time.time() - last_run) > timedelta(days=7).total_seconds()
     
     def mark_run_complete(self):
         """Mark the current run as complete"""
-        with open("last_run.txt", 'w') as f:
-            f.write(datetime.now().isoformat())
+        # Rewriting the file bumps its mtime; the timestamp is kept for humans
+        Path("last_run.txt").write_text(datetime.now().isoformat())
 
 
 async def main():
@@ -467,6 +646,8 @@ async def main():
                        help='Run in dry-run mode (no pull request)')
     parser.add_argument('--force', action='store_true',
                        help='Force run even if not scheduled')
+    parser.add_argument('--force-reprocess', action='store_true',
+                       help='Ignore cached LLM results and reprocess every example')
     
     args = parser.parse_args()
     
@@ -477,7 +658,7 @@ async def main():
         return
     
     # Run workflow
-    workflow = WorkflowManager(dry_run=args.dry_run)
+    workflow = WorkflowManager(dry_run=args.dry_run, force_reprocess=args.force_reprocess)
     success = await workflow.run_weekly_update()
     
     if success:
@@ -0,0 +1,47 @@
+"""
+Pooled HTTP server shared by the local gallery and the quick demo
+
+Standard library only, so the demo can import it without the scraping
+dependencies.
+"""
+
+import http.server
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTP server that handles requests on a fixed pool of worker threads"""
+
+    request_queue_size = 128
+    # Rebind straight away after a restart (HTTPServer's default, made
+    # explicit); SO_REUSEPORT stays off so a second server on the same
+    # port fails instead of silently sharing it
+    allow_reuse_address = True
+
+    def __init__(self, *args, workers=None, **kwargs):
+        # A handful of browser connections is far below the point where an
+        # event loop would beat threads, so a small bounded pool is enough.
+        # Keep at least 8 workers: a browser holds up to 6 keep-alive
+        # connections per host, each pinning a worker while idle
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers or max(8, min(32, (os.cpu_count() or 1) * 4)))
+        # The pool must exist before binding, which may fail and call server_close
+        super().__init__(*args, **kwargs)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        # Drop queued connections too; workers are non-daemon threads, so
+        # anything left running would keep the interpreter alive on exit
+        self._pool.shutdown(wait=False, cancel_futures=True)
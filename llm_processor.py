@@ -8,19 +8,125 @@ for inclusion in the PyHC gallery.
 
 import os
 import asyncio
+import hashlib
+import importlib.util
 import logging
-from typing import List, Optional, Dict, Any
-from dataclasses import dataclass
+import random
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
+from dataclasses import dataclass, asdict, replace
 import json
 import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain
 
 try:
     import anthropic
+    import httpx  # installed with anthropic, which builds its client on it
 except ImportError:
     anthropic = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(value: Any) -> str:
+    """Compact JSON text, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value)
+
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+# Characters dropped from, and whitespace runs collapsed in, output filenames
+_NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9\s]')
+_WS_RE = re.compile(r'\s+')
+
+# Comments and tokens of Python source, for near-duplicate detection
+_COMMENT_RE = re.compile(r'#[^\n]*')
+_CODE_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+
+def code_shingles(code: str, size: int = 3) -> frozenset:
+    """Overlapping token n-grams of code, ignoring comments and layout
+    
+    Two snippets that differ only in formatting, comments or a small edit
+    share most of their shingles, so the Jaccard similarity of the sets is
+    a cheap near-duplicate measure.
+    """
+    tokens = _CODE_TOKEN_RE.findall(_COMMENT_RE.sub('', code))
+    if len(tokens) <= size:
+        return frozenset([tuple(tokens)])
+    return frozenset(tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+
+
+# Code longer than this is cut down to its head and tail before sending
+_MAX_CODE_CHARS = 8000
+_CODE_HEAD_CHARS = 6000
+_CODE_TAIL_CHARS = 2000
+
+# Leading run of comment/blank lines, dropped if it is a license header
+_LEADING_COMMENTS_RE = re.compile(r'\A(?:[ \t]*(?:#[^\n]*)?\n)+')
+_LICENSE_RE = re.compile(r'licen[cs]e|copyright', re.IGNORECASE)
+_DATA_URI_RE = re.compile(r'data:[\w/+.-]+;base64,[A-Za-z0-9+/=]{200,}')
+_NOQA_RE = re.compile(r'[ \t]*#\s*noqa\b[^\n]*')
+_BLANK_RUN_RE = re.compile(r'\n(?:[ \t]*\n){2,}')
+
+# processing_notes of results produced when processing an example failed
+_FALLBACK_NOTES = "Fallback result due to processing failure"
+_FAILED_NOTES = "Failed to process"
+
+
+@lru_cache(maxsize=256)
+def _preprocess_code(code: str) -> Tuple[str, Tuple[str, ...]]:
+    """Strip content that only costs tokens from scraped code
+    
+    Drops a leading license header, embedded base64 data URIs, ``# noqa``
+    comments and runs of blank lines, then truncates oversized code to its
+    head and tail. Returns the code and any warnings to attach to the
+    result. Cached because the prompt is built more than once per example.
+    """
+    warnings = []
+    
+    header = _LEADING_COMMENTS_RE.match(code)
+    if header and _LICENSE_RE.search(header.group()):
+        code = code[header.end():]
+    
+    code = _DATA_URI_RE.sub('data:<stripped>', code)
+    code = _NOQA_RE.sub('', code)
+    code = _BLANK_RUN_RE.sub('\n\n', code)
+    
+    if len(code) > _MAX_CODE_CHARS:
+        omitted = len(code) - _CODE_HEAD_CHARS - _CODE_TAIL_CHARS
+        code = (f"{code[:_CODE_HEAD_CHARS]}\n# ... [truncated {omitted} characters] ...\n"
+                f"{code[-_CODE_TAIL_CHARS:]}")
+        warnings.append(f"Original code was truncated ({omitted} characters omitted) before processing")
+    
+    return code, tuple(warnings)
+
 
-@dataclass
+# Example-specific part of the prompt (follows the shared instructions)
+_EXAMPLE_PROMPT_TEMPLATE = """CURRENT EXAMPLE:
+Package: {package}
+Title: {title}
+Description: {description}
+Category: {category}
+Source URL: {source_url}
+
+CODE:
+```python
+{code}
+```"""
+
+
+@dataclass(slots=True)
 class ProcessingResult:
     """Result of LLM processing"""
     improved_code: str
@@ -32,10 +138,196 @@ class ProcessingResult:
     processing_notes: str
 
 
+class ResultCache:
+    """Persistent SQLite cache of LLM processing results
+    
+    Results are stored as JSON keyed by a hash of the request (model, prompt
+    and max_tokens), so unchanged examples are not sent to the API again on
+    the next run. Entries older than ttl_seconds are treated as misses; a
+    disabled cache never hits and stores nothing.
+    
+    Cached examples can also be indexed by package and code so that
+    near-duplicates (the same snippet copied between doc versions, say) can
+    reuse a result via get_similar. Only examples processed with the same
+    model, prompt instructions, title and description are candidates.
+    """
+    
+    def __init__(self, path: str, enabled: bool = True, ttl_seconds: Optional[float] = None):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        # The index used to be keyed on package and code alone; rebuild it
+        # rather than match entries made with another model or prompt
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(examples)")}
+        if columns and 'prompt_hash' not in columns:
+            self._conn.execute("DROP TABLE examples")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS examples "
+            "(key TEXT PRIMARY KEY, package TEXT NOT NULL, model TEXT NOT NULL, "
+            "prompt_hash TEXT NOT NULL, title TEXT NOT NULL, description TEXT NOT NULL, "
+            "code TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        # Shingles of indexed examples, loaded per (package, model, prompt_hash,
+        # title, description) group on first use
+        self._shingles: Dict[Tuple[str, ...], Dict[str, frozenset]] = {}
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None on a miss"""
+        if not self.enabled:
+            return None
+        
+        row = self._conn.execute(
+            "SELECT value, created_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        value, created_at = row
+        if self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds:
+            return None
+        return _json_loads(value)
+    
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store a result under key, replacing any previous entry"""
+        if not self.enabled:
+            return
+        
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, created_at) VALUES (?, ?, ?)",
+            (key, _json_dumps(value), time.time())
+        )
+        self._conn.commit()
+    
+    def add_example(self, key: str, package: str, code: str, model: str,
+                    prompt_hash: str, title: str, description: str):
+        """Index the example whose result is stored under key for get_similar"""
+        if not self.enabled:
+            return
+        
+        self._conn.execute(
+            "INSERT OR REPLACE INTO examples "
+            "(key, package, model, prompt_hash, title, description, code) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, package, model, prompt_hash, title, description, code)
+        )
+        self._conn.commit()
+        group = (package, model, prompt_hash, title, description)
+        if group in self._shingles:
+            self._shingles[group][key] = code_shingles(code)
+    
+    def get_similar(self, package: str, code: str, threshold: float, model: str,
+                    prompt_hash: str, title: str, description: str) -> Optional[Dict[str, Any]]:
+        """Return the result of the most similar indexed example from the same package
+        
+        Only examples indexed with the same model, prompt_hash, title and
+        description are compared. Similarity is the Jaccard index of the code
+        shingles; None is returned unless the best match reaches threshold.
+        """
+        if not self.enabled:
+            return None
+        
+        group = (package, model, prompt_hash, title, description)
+        if group not in self._shingles:
+            rows = self._conn.execute(
+                "SELECT key, code FROM examples WHERE package = ? AND model = ? "
+                "AND prompt_hash = ? AND title = ? AND description = ?", group
+            ).fetchall()
+            self._shingles[group] = {key: code_shingles(stored) for key, stored in rows}
+        
+        shingles = code_shingles(code)
+        best_key, best_score = None, 0.0
+        for key, other in self._shingles[group].items():
+            score = len(shingles & other) / len(shingles | other)
+            if score > best_score:
+                best_key, best_score = key, score
+        
+        if best_key is None or best_score < threshold:
+            return None
+        return self.get(best_key)
+    
+    def close(self):
+        self._conn.close()
+
+
+class RateLimiter:
+    """Client-side request and token budget for the Anthropic API
+    
+    Tracks requests and tokens spent in the current one-minute window and
+    waits for the next window instead of running into 429 responses.
+    A limit of None leaves that dimension unbounded.
+    """
+    
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests_remaining = rpm
+        self.tokens_remaining = tpm
+        self.reset_at = time.monotonic() + 60
+    
+    async def acquire(self, est_tokens: int = 0):
+        """Wait until the current window has budget for one more request"""
+        if self.tpm is not None:
+            # A request larger than the whole budget runs alone in a fresh window
+            est_tokens = min(est_tokens, self.tpm)
+        
+        while True:
+            now = time.monotonic()
+            if now >= self.reset_at:
+                self.requests_remaining = self.rpm
+                self.tokens_remaining = self.tpm
+                self.reset_at = now + 60
+            
+            has_request = self.requests_remaining is None or self.requests_remaining > 0
+            has_tokens = self.tokens_remaining is None or self.tokens_remaining >= est_tokens
+            if has_request and has_tokens:
+                if self.requests_remaining is not None:
+                    self.requests_remaining -= 1
+                if self.tokens_remaining is not None:
+                    self.tokens_remaining -= est_tokens
+                return
+            
+            await asyncio.sleep(self.reset_at - now)
+
+
 class ClaudeExampleProcessor:
-    """Process examples using Claude API"""
+    """Process examples using Claude API
+    
+    Cleanup and classification of short examples doesn't need a large
+    model, so requests go to Haiku by default: a fraction of Sonnet's price
+    with lower latency, which matters when throughput is bounded by rate
+    limits. Results Haiku is not confident about (below
+    ESCALATION_THRESHOLD) are retried once on the escalation model and the
+    more confident of the two is kept; pass escalation_model=None to
+    disable this.
+    """
     
-    def __init__(self, api_key: Optional[str] = None):
+    DEFAULT_MODEL = "claude-haiku-4-5"
+    ESCALATION_MODEL = "claude-sonnet-4-5"
+    ESCALATION_THRESHOLD = 0.6
+    # Retries of a message request, done by _create_message alone (the SDK's
+    # own retries are off so the rate limiter sees every attempt)
+    MAX_RETRIES = 3
+    # SDK-level retries for the batch create/poll/results calls, which don't
+    # go through _create_message
+    BATCH_API_RETRIES = 2
+    MAX_TOKENS = 4000
+    # Minimum code similarity for reusing a near-duplicate's cached result
+    SIMILARITY_THRESHOLD = 0.92
+    BATCH_POLL_INTERVAL = 30
+    # Batches can take longer than the default 5 minute cache lifetime
+    BATCH_CACHE_TTL = "1h"
+    
+    def __init__(self, api_key: Optional[str] = None, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResultCache] = None, model: str = DEFAULT_MODEL,
+                 escalation_model: Optional[str] = ESCALATION_MODEL):
+        self.model = model
+        self.escalation_model = escalation_model
         self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY environment variable not set")
@@ -43,50 +335,244 @@ class ClaudeExampleProcessor:
         if anthropic is None:
             raise ImportError("anthropic package not installed. Run: pip install anthropic")
         
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        # Async client so concurrent requests don't block the event loop.
+        # Connections are kept alive (and multiplexed over HTTP/2 when h2 is
+        # installed) so concurrent requests reuse them instead of paying a
+        # TLS handshake each.
+        limits = httpx.Limits(
+            max_connections=64, max_keepalive_connections=64, keepalive_expiry=60.0
+        )
+        self.client = anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            max_retries=0,
+            timeout=anthropic.Timeout(connect=5.0, read=60.0, write=10.0, pool=5.0),
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                http2=importlib.util.find_spec('h2') is not None,
+                limits=limits
+            )
+        )
+        self.rate_limiter = rate_limiter
+        self.cache = cache
         self.logger = logging.getLogger(__name__)
     
-    async def process_example(self, example: Dict[str, Any]) -> ProcessingResult:
-        """Process a single code example using Claude"""
+    async def aclose(self):
+        """Close the client's connection pool"""
+        await self.client.close()
+    
+    def cache_key(self, example: Dict[str, Any]) -> str:
+        """Cache key for an example: a hash of the model, prompt and max_tokens"""
+        prompt = self._create_processing_prompt(example)
+        payload = json.dumps({
+            'model': self.model,
+            'prompt': [block["text"] for block in prompt],
+            'max_tokens': self.MAX_TOKENS
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    async def process_example(self, example: Dict[str, Any], use_cache: bool = True) -> ProcessingResult:
+        """Process a single code example using Claude
+        
+        A cached result for an identical request is returned without calling
+        the API unless use_cache is False.
+        """
+        if use_cache:
+            cached = self.cached_result(example)
+            if cached is not None:
+                return cached
         
         prompt = self._create_processing_prompt(example)
         
         try:
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=4000,
-                temperature=0.1,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
+            response = await self._create_message(prompt)
             
-            result_text = response.content[0].text
-            return self._parse_claude_response(result_text, example)
+            result = self._parse_claude_response(response, example)
             
         except Exception as e:
-            self.logger.error(f"Failed to process example with Claude: {e}")
+            self.logger.error("Failed to process example with Claude: %s", e)
             return self._create_fallback_result(example)
+        
+        result = await self._escalate(example, result)
+        self._cache_result(example, result)
+        return result
     
-    def _create_processing_prompt(self, example: Dict[str, Any]) -> str:
-        """Create a detailed prompt for Claude to process the example"""
+    async def process_batch(self, examples: List[Dict[str, Any]],
+                            semaphore: Optional[asyncio.Semaphore] = None) -> List[ProcessingResult]:
+        """Process examples through the Message Batches API
         
-        return f"""You are helping improve a Python code example for the PyHC (Python in Heliophysics Community) Gallery. The gallery showcases examples of how to use various heliophysics Python packages.
-
-CURRENT EXAMPLE:
-Package: {example.get('package', 'unknown')}
-Title: {example.get('title', 'Untitled')}
-Description: {example.get('description', 'No description')}
-Category: {example.get('category', 'general')}
-Source URL: {example.get('source_url', 'unknown')}
-
-CODE:
-```python
-{example.get('code', '')}
-```
+        Batches are billed at half the per-request price and are not subject
+        to the per-minute rate limits, at the cost of latency: the batch is
+        polled every BATCH_POLL_INTERVAL seconds until it has ended. Results
+        are returned in input order; requests that did not succeed get the
+        fallback result.
+        
+        Low-confidence results are escalated with individual requests, at most
+        as many at once as semaphore allows (one at a time if not given).
+        """
+        requests = [
+            {
+                "custom_id": f"ex-{i}",
+                "params": self._message_params(
+                    self._create_processing_prompt(example, cache_ttl=self.BATCH_CACHE_TTL)
+                )
+            }
+            for i, example in enumerate(examples)
+        ]
+        
+        batches = self.client.with_options(max_retries=self.BATCH_API_RETRIES).messages.batches
+        batch = await batches.create(requests=requests)
+        self.logger.info("Submitted message batch %s with %d requests", batch.id, len(requests))
+        
+        while batch.processing_status != "ended":
+            await asyncio.sleep(self.BATCH_POLL_INTERVAL)
+            batch = await batches.retrieve(batch.id)
+        
+        results: List[Optional[ProcessingResult]] = [None] * len(examples)
+        succeeded = []
+        async for entry in await batches.results(batch.id):
+            i = int(entry.custom_id.split('-', 1)[1])
+            example = examples[i]
+            try:
+                if entry.result.type != "succeeded":
+                    raise ValueError(f"batch request {entry.result.type}")
+                results[i] = self._parse_claude_response(entry.result.message, example)
+            except Exception as e:
+                self.logger.error("Failed to process example with Claude: %s", e)
+                results[i] = self._create_fallback_result(example)
+            else:
+                succeeded.append(i)
+        
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(1)
+        
+        async def escalate(i: int) -> ProcessingResult:
+            async with semaphore:
+                return await self._escalate(examples[i], results[i])
+        
+        escalated = await asyncio.gather(*(escalate(i) for i in succeeded))
+        for i, result in zip(succeeded, escalated):
+            results[i] = result
+            self._cache_result(examples[i], result)
+        
+        return [
+            result if result is not None else self._create_fallback_result(example)
+            for result, example in zip(results, examples)
+        ]
+    
+    def cached_result(self, example: Dict[str, Any]) -> Optional[ProcessingResult]:
+        """Return the cached result for an identical request or, failing that,
+        for a near-duplicate example from the same package"""
+        if self.cache is None:
+            return None
+        
+        cached = self.cache.get(self.cache_key(example))
+        if cached is not None:
+            return ProcessingResult(**cached)
+        
+        similar = self.cache.get_similar(
+            example.get('package', ''), example.get('code', ''), self.SIMILARITY_THRESHOLD,
+            **self._similarity_context(example)
+        )
+        if similar is not None:
+            result = ProcessingResult(**similar)
+            result.processing_notes = f"{result.processing_notes} (reused from a near-duplicate example)"
+            return result
+        
+        return None
+    
+    def _cache_result(self, example: Dict[str, Any], result: ProcessingResult):
+        """Cache a successful result (failures are retried on the next run)"""
+        if self.cache is not None:
+            key = self.cache_key(example)
+            self.cache.set(key, asdict(result))
+            self.cache.add_example(key, example.get('package', ''), example.get('code', ''),
+                                   **self._similarity_context(example))
+    
+    def _similarity_context(self, example: Dict[str, Any]) -> Dict[str, str]:
+        """What a near-duplicate must share besides similar code to reuse a result"""
+        return {
+            'model': self.model,
+            'prompt_hash': hashlib.sha256(self._static_prompt_prefix().encode()).hexdigest(),
+            'title': example.get('title', ''),
+            'description': example.get('description', '')
+        }
+    
+    async def _escalate(self, example: Dict[str, Any], result: ProcessingResult) -> ProcessingResult:
+        """Retry a low-confidence result on the escalation model
+        
+        Returns whichever of the two results is more confident; the original
+        result is kept if the retry fails.
+        """
+        if (self.escalation_model is None or self.escalation_model == self.model
+                or result.confidence_score >= self.ESCALATION_THRESHOLD):
+            return result
+        
+        self.logger.info("Low confidence (%.2f) - retrying with %s", result.confidence_score, self.escalation_model)
+        try:
+            response = await self._create_message(
+                self._create_processing_prompt(example), model=self.escalation_model
+            )
+            escalated = self._parse_claude_response(response, example)
+        except Exception as e:
+            self.logger.warning("Retry with %s failed: %s", self.escalation_model, e)
+            return result
+        
+        return escalated if escalated.confidence_score > result.confidence_score else result
+    
+    def _message_params(self, prompt: List[Dict[str, Any]], model: Optional[str] = None) -> Dict[str, Any]:
+        """Request parameters shared by single and batched requests"""
+        return {
+            "model": model or self.model,
+            "max_tokens": self.MAX_TOKENS,
+            # Deterministic output keeps cached results representative
+            "temperature": 0.0,
+            # Forcing the tool call makes the response follow RESULT_TOOL's schema
+            "tools": [self.RESULT_TOOL],
+            "tool_choice": {"type": "tool", "name": self.RESULT_TOOL["name"]},
+            "messages": [{
+                "role": "user",
+                "content": prompt
+            }]
+        }
+    
+    async def _create_message(self, prompt: List[Dict[str, Any]], model: Optional[str] = None):
+        """Send the prompt to Claude, backing off and retrying on transient errors
+        
+        Rate limits (429), overload (529), other server errors, connection
+        errors and timeouts are retried with jittered exponential backoff;
+        other API errors are raised. This is the only retry layer: the client
+        is created with max_retries=0.
+        """
+        # Rough input size estimate (~4 characters per token)
+        est_tokens = sum(len(block["text"]) for block in prompt) // 4
+        
+        for attempt in range(self.MAX_RETRIES + 1):
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(est_tokens)
+            
+            try:
+                # Streaming keeps the connection active while the response is
+                # generated, so the read timeout applies between chunks
+                async with self.client.messages.stream(**self._message_params(prompt, model)) as stream:
+                    return await stream.get_final_message()
+            except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+                # APIConnectionError also covers APITimeoutError
+                if isinstance(e, anthropic.APIStatusError):
+                    retryable = isinstance(e, anthropic.RateLimitError) or e.status_code >= 500
+                    error = e.status_code
+                else:
+                    retryable = True
+                    error = type(e).__name__
+                if not retryable or attempt == self.MAX_RETRIES:
+                    raise
+                delay = min(60, 2 ** (attempt + 1)) + random.uniform(0, 1)
+                self.logger.warning("Claude API error %s - retrying in %.1fs", error, delay)
+                await asyncio.sleep(delay)
+    
+    # Instructions shared by every request. They come first in the prompt so
+    # the API can cache them as a prefix (see _create_processing_prompt).
+    PROMPT_INSTRUCTIONS = """You are helping improve a Python code example for the PyHC (Python in Heliophysics Community) Gallery. The gallery showcases examples of how to use various heliophysics Python packages.
 
-TASK: Please improve this example to meet PyHC Gallery standards:
+TASK: Please improve the example given after these instructions to meet PyHC Gallery standards:
 
 1. **Code Quality:**
    - Fix any syntax errors or issues
@@ -125,42 +611,112 @@ IMPORTANT CONSTRAINTS:
 - Don't change the fundamental purpose of the example
 - Maintain compatibility with matplotlib for any plotting
 
-Please respond in this JSON format:
-```json
-{{
-    "improved_title": "Clear, descriptive title here",
-    "improved_description": "Helpful description explaining what this example demonstrates and why it's useful",
-    "category": "appropriate_category_name",
-    "improved_code": "Complete improved Python code here",
-    "confidence_score": 0.85,
-    "warnings": ["Any warnings about dependencies, compatibility, etc."],
-    "processing_notes": "Brief notes about what changes were made"
-}}
-```"""
+Submit the result with the submit_improved_example tool."""
     
-    def _parse_claude_response(self, response_text: str, original_example: Dict[str, Any]) -> ProcessingResult:
-        """Parse Claude's JSON response"""
-        try:
-            # Extract JSON from the response
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', response_text, re.DOTALL)
-            if not json_match:
-                raise ValueError("No JSON found in response")
-            
-            result_data = json.loads(json_match.group(1))
-            
-            return ProcessingResult(
-                improved_code=result_data.get('improved_code', original_example.get('code', '')),
-                improved_title=result_data.get('improved_title', original_example.get('title', 'Untitled')),
-                improved_description=result_data.get('improved_description', original_example.get('description', '')),
-                category=result_data.get('category', original_example.get('category', 'general')),
-                confidence_score=result_data.get('confidence_score', 0.5),
-                warnings=result_data.get('warnings', []),
-                processing_notes=result_data.get('processing_notes', 'Processed by Claude')
-            )
-            
-        except Exception as e:
-            self.logger.error(f"Failed to parse Claude response: {e}")
-            return self._create_fallback_result(original_example)
+    CATEGORIES = [
+        "maps", "time_series", "plotting", "data_acquisition",
+        "coordinates", "basic", "diagnostics", "general"
+    ]
+    
+    # Tool Claude must call with its result; the schema replaces asking for
+    # fenced JSON in the prompt and parsing it back out of the text
+    RESULT_TOOL = {
+        "name": "submit_improved_example",
+        "description": "Submit the improved example for the PyHC Gallery",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "improved_title": {
+                    "type": "string",
+                    "description": "Clear, descriptive title"
+                },
+                "improved_description": {
+                    "type": "string",
+                    "description": "Helpful description explaining what this example demonstrates and why it's useful"
+                },
+                "category": {"type": "string", "enum": CATEGORIES},
+                "improved_code": {
+                    "type": "string",
+                    "description": "Complete improved Python code"
+                },
+                "confidence_score": {
+                    "type": "number",
+                    "minimum": 0,
+                    "maximum": 1,
+                    "description": "Confidence that the improved example is correct and runnable"
+                },
+                "warnings": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Any warnings about dependencies, compatibility, etc."
+                },
+                "processing_notes": {
+                    "type": "string",
+                    "description": "Brief notes about what changes were made"
+                }
+            },
+            "required": [
+                "improved_title", "improved_description", "category", "improved_code",
+                "confidence_score", "warnings", "processing_notes"
+            ]
+        }
+    }
+    
+    def _create_processing_prompt(self, example: Dict[str, Any], cache_ttl: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Create the prompt content blocks for Claude to process the example
+        
+        The static instructions are marked with cache_control so repeated
+        requests only pay full price for the example-specific suffix.
+        """
+        cache_control = {"type": "ephemeral"}
+        if cache_ttl:
+            cache_control["ttl"] = cache_ttl
+        
+        return [
+            {"type": "text", "text": self._static_prompt_prefix(), "cache_control": cache_control},
+            {"type": "text", "text": self._dynamic_prompt_suffix(example)}
+        ]
+    
+    def _static_prompt_prefix(self) -> str:
+        """Instructions that are identical for every example"""
+        return self.PROMPT_INSTRUCTIONS
+    
+    def _dynamic_prompt_suffix(self, example: Dict[str, Any]) -> str:
+        """The example being processed"""
+        return _EXAMPLE_PROMPT_TEMPLATE.format(
+            package=example.get('package', 'unknown'),
+            title=example.get('title', 'Untitled'),
+            description=example.get('description', 'No description'),
+            category=example.get('category', 'general'),
+            source_url=example.get('source_url', 'unknown'),
+            code=_preprocess_code(example.get('code', ''))[0]
+        )
+    
+    def _parse_claude_response(self, message: Any, original_example: Dict[str, Any]) -> ProcessingResult:
+        """Read the result from Claude's submit_improved_example tool call
+        
+        Raises ValueError if the response does not contain the tool call.
+        """
+        tool_use = next(
+            (block for block in message.content
+             if block.type == "tool_use" and block.name == self.RESULT_TOOL["name"]),
+            None
+        )
+        if tool_use is None:
+            raise ValueError("No tool call found in response")
+        
+        result_data = tool_use.input
+        _, code_warnings = _preprocess_code(original_example.get('code', ''))
+        
+        return ProcessingResult(
+            improved_code=result_data.get('improved_code', original_example.get('code', '')),
+            improved_title=result_data.get('improved_title', original_example.get('title', 'Untitled')),
+            improved_description=result_data.get('improved_description', original_example.get('description', '')),
+            category=result_data.get('category', original_example.get('category', 'general')),
+            confidence_score=result_data.get('confidence_score', 0.5),
+            warnings=[*code_warnings, *result_data.get('warnings', [])],
+            processing_notes=result_data.get('processing_notes', 'Processed by Claude')
+        )
     
     def _create_fallback_result(self, example: Dict[str, Any]) -> ProcessingResult:
         """Create fallback result when Claude processing fails"""
@@ -171,7 +727,7 @@ Please respond in this JSON format:
             category=example.get('category', 'general'),
             confidence_score=0.1,
             warnings=["LLM processing failed - using original content"],
-            processing_notes="Fallback result due to processing failure"
+            processing_notes=_FALLBACK_NOTES
         )
 
 
@@ -224,22 +780,12 @@ Processing confidence: {result.confidence_score:.2f}
             "processing_date": "2024-01-01",  # Would use actual date
             "total_examples": len(results),
             "average_confidence": sum(r.confidence_score for r in results) / len(results) if results else 0,
-            "categories": list(set(r.category for r in results)),
-            "warnings_summary": {},
+            "categories": sorted({r.category for r in results}),
+            # Collect warning statistics
+            "warnings_summary": dict(Counter(chain.from_iterable(r.warnings for r in results))),
             "examples": []
         }
         
-        # Collect warning statistics
-        all_warnings = []
-        for result in results:
-            all_warnings.extend(result.warnings)
-        
-        warning_counts = {}
-        for warning in all_warnings:
-            warning_counts[warning] = warning_counts.get(warning, 0) + 1
-        
-        metadata["warnings_summary"] = warning_counts
-        
         # Add example metadata
         for i, result in enumerate(results):
             metadata["examples"].append({
@@ -250,86 +796,209 @@ Processing confidence: {result.confidence_score:.2f}
                 "warnings_count": len(result.warnings)
             })
         
-        with open(output_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        if orjson is not None:
+            data = orjson.dumps(metadata, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(metadata, indent=2).encode('utf-8')
+        Path(output_path).write_bytes(data)
 
 
 class BatchProcessor:
-    """Process multiple examples in batch"""
+    """Process multiple examples in batch
     
-    def __init__(self, api_key: Optional[str] = None, max_concurrent: int = 3):
-        self.processor = ClaudeExampleProcessor(api_key)
+    Runs with at least batch_threshold uncached examples are submitted as a
+    single Message Batch; smaller runs (or batch_threshold=None) send
+    concurrent individual requests.
+    """
+    
+    def __init__(self, api_key: Optional[str] = None, max_concurrent: int = 3,
+                 rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 cache: Optional[ResultCache] = None,
+                 batch_threshold: Optional[int] = 50,
+                 model: str = ClaudeExampleProcessor.DEFAULT_MODEL):
+        rate_limiter = RateLimiter(rpm, tpm) if (rpm or tpm) else None
+        self.processor = ClaudeExampleProcessor(api_key, rate_limiter=rate_limiter, cache=cache,
+                                                model=model)
         self.max_concurrent = max_concurrent
+        self.batch_threshold = batch_threshold
         self.logger = logging.getLogger(__name__)
     
-    async def process_examples(self, examples: List[Dict[str, Any]]) -> List[ProcessingResult]:
-        """Process multiple examples with rate limiting"""
-        results = []
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Close the underlying API client"""
+        await self.processor.aclose()
+    
+    async def iter_results(self, examples: List[Dict[str, Any]],
+                           force_reprocess: bool = False) -> AsyncIterator[Tuple[int, ProcessingResult]]:
+        """Yield (index, result) pairs as each example finishes processing
         
-        # Process in batches to avoid rate limits
-        for i in range(0, len(examples), self.max_concurrent):
-            batch = examples[i:i + self.max_concurrent]
-            self.logger.info(f"Processing batch {i//self.max_concurrent + 1}/{(len(examples) + self.max_concurrent - 1)//self.max_concurrent}")
-            
-            # Process batch concurrently
-            batch_tasks = []
-            for example in batch:
-                # Add delay between requests
-                await asyncio.sleep(1)
-                task = asyncio.create_task(self.processor.process_example(example))
-                batch_tasks.append(task)
+        Cached results are yielded first; the rest arrive in completion
+        order rather than input order. Examples with a cached result are
+        not sent to the API unless force_reprocess is set, and identical
+        examples (same code and package) are only sent once.
+        """
+        pending = []
+        cached_results = []
+        for i, example in enumerate(examples):
+            cached = None if force_reprocess else self.processor.cached_result(example)
             
-            batch_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
-            
-            for result in batch_results:
-                if isinstance(result, Exception):
-                    self.logger.error(f"Failed to process example: {result}")
+            if cached is not None:
+                cached_results.append((i, cached))
+            else:
+                pending.append(i)
+        
+        if cached_results:
+            self.logger.info("Using cached results for %d unchanged or near-duplicate examples", len(cached_results))
+        for item in cached_results:
+            yield item
+        
+        # Group identical examples; the first of each group is processed and
+        # its result is shared with the rest
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for i in pending:
+            example = examples[i]
+            content = f"{example.get('package', '')}\0{example.get('code', '')}"
+            groups[hashlib.sha256(content.encode()).hexdigest()].append(i)
+        duplicates = {indices[0]: indices[1:] for indices in groups.values()}
+        pending = list(duplicates)
+        
+        skipped = sum(len(others) for others in duplicates.values())
+        if skipped:
+            self.logger.info("Skipping %d duplicate examples", skipped)
+        
+        def with_duplicates(i: int, result: ProcessingResult):
+            yield i, result
+            for other in duplicates[i]:
+                yield other, replace(result)
+        
+        # Bound the number of in-flight requests, including escalations of
+        # batch results; the processor's rate limiter and retry logic handle
+        # the API's request/token budget
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        
+        if self.batch_threshold is not None and len(pending) >= self.batch_threshold:
+            try:
+                batch_results = await self.processor.process_batch(
+                    [examples[i] for i in pending], semaphore=semaphore
+                )
+            except Exception as e:
+                self.logger.warning("Message batch failed, falling back to individual requests: %s", e)
+            else:
+                for i, result in zip(pending, batch_results):
+                    for item in with_duplicates(i, result):
+                        yield item
+                return
+        
+        async def process_one(i: int) -> Tuple[int, ProcessingResult]:
+            async with semaphore:
+                try:
+                    # The cache was already checked above (or bypassed)
+                    return i, await self.processor.process_example(examples[i], use_cache=False)
+                except Exception as e:
+                    self.logger.error("Failed to process example: %s", e)
                     # Create fallback result
-                    results.append(ProcessingResult(
+                    return i, ProcessingResult(
                         improved_code="# Error processing this example",
                         improved_title="Processing Error",
                         improved_description="This example could not be processed",
                         category="error",
                         confidence_score=0.0,
                         warnings=["Processing failed"],
-                        processing_notes="Failed to process"
-                    ))
-                else:
-                    results.append(result)
+                        processing_notes=_FAILED_NOTES
+                    )
+        
+        self.logger.info("Processing %d examples (max %d concurrent)", len(pending), self.max_concurrent)
+        for next_result in asyncio.as_completed([process_one(i) for i in pending]):
+            for item in with_duplicates(*await next_result):
+                yield item
+    
+    async def process_examples(self, examples: List[Dict[str, Any]],
+                               force_reprocess: bool = False) -> List[ProcessingResult]:
+        """Process multiple examples with rate limiting, preserving input order"""
+        results: List[Optional[ProcessingResult]] = [None] * len(examples)
+        async for i, result in self.iter_results(examples, force_reprocess):
+            results[i] = result
+        return results
+    
+    async def process_and_save(self, examples: List[Dict[str, Any]], output_dir: str,
+                               force_reprocess: bool = False) -> List[ProcessingResult]:
+        """Process examples, saving each one as soon as its result arrives
+        
+        Every saved example also gets a `.done/<cache key>.json` record holding
+        its result. Rerunning into the same directory loads recorded examples
+        instead of processing them again, so an interrupted run resumes where
+        it stopped. Failed examples are not recorded and are retried.
+        """
+        output_path = Path(output_dir)
+        done_dir = output_path / '.done'
+        done_dir.mkdir(parents=True, exist_ok=True)
+        
+        results: List[Optional[ProcessingResult]] = [None] * len(examples)
+        records = [done_dir / f"{self.processor.cache_key(example)}.json" for example in examples]
+        pending = []
+        for i, record in enumerate(records):
+            if not force_reprocess and record.exists():
+                results[i] = ProcessingResult(**_json_loads(record.read_bytes()))
+            else:
+                pending.append(i)
+        
+        if len(pending) < len(examples):
+            self.logger.info("Resuming: %d of %d examples already saved",
+                             len(examples) - len(pending), len(examples))
+        
+        async for j, result in self.iter_results([examples[i] for i in pending], force_reprocess):
+            i = pending[j]
+            results[i] = result
+            await self._save_example(i, result, examples[i], output_path)
+            if result.processing_notes not in (_FALLBACK_NOTES, _FAILED_NOTES):
+                await asyncio.to_thread(records[i].write_text, _json_dumps(asdict(result)))
         
+        metadata_path = output_path / 'processing_metadata.json'
+        await asyncio.to_thread(ExampleFormatter.create_metadata_file, results, str(metadata_path))
+        self.logger.info("Saved processing metadata: %s", metadata_path)
         return results
     
+    async def _save_example(self, i: int, result: ProcessingResult,
+                            original: Dict[str, Any], output_path: Path):
+        """Write one processed example to its gallery file"""
+        package = original.get('package', 'unknown')
+        safe_title = _NON_ALNUM_RE.sub('', result.improved_title)
+        safe_title = _WS_RE.sub('_', safe_title).lower()[:50]
+        filename = f"{package}_{i+1:03d}_{safe_title}.py"
+        
+        gallery_content = ExampleFormatter.format_for_gallery(
+            result, 
+            package, 
+            original.get('source_url', 'unknown')
+        )
+        
+        # Save file in a worker thread
+        await asyncio.to_thread(
+            (output_path / filename).write_text, gallery_content, encoding='utf-8'
+        )
+        self.logger.info("Saved processed example: %s", filename)
+    
     async def save_processed_examples(self, results: List[ProcessingResult], 
                                     original_examples: List[Dict[str, Any]], 
                                     output_dir: str):
-        """Save processed examples to files"""
-        os.makedirs(output_dir, exist_ok=True)
-        
-        for i, (result, original) in enumerate(zip(results, original_examples)):
-            # Create filename
-            package = original.get('package', 'unknown')
-            safe_title = re.sub(r'[^a-zA-Z0-9\s]', '', result.improved_title)
-            safe_title = re.sub(r'\s+', '_', safe_title).lower()[:50]
-            filename = f"{package}_{i+1:03d}_{safe_title}.py"
-            
-            # Format for gallery
-            gallery_content = ExampleFormatter.format_for_gallery(
-                result, 
-                package, 
-                original.get('source_url', 'unknown')
-            )
-            
-            # Save file
-            output_path = os.path.join(output_dir, filename)
-            with open(output_path, 'w') as f:
-                f.write(gallery_content)
-            
-            self.logger.info(f"Saved processed example: {filename}")
+        """Save processed examples to files, writing them concurrently"""
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        await asyncio.gather(*(
+            self._save_example(i, result, original, output_path)
+            for i, (result, original) in enumerate(zip(results, original_examples))
+        ))
         
         # Save metadata
-        metadata_path = os.path.join(output_dir, 'processing_metadata.json')
-        ExampleFormatter.create_metadata_file(results, metadata_path)
-        self.logger.info(f"Saved processing metadata: {metadata_path}")
+        metadata_path = output_path / 'processing_metadata.json'
+        await asyncio.to_thread(ExampleFormatter.create_metadata_file, results, str(metadata_path))
+        self.logger.info("Saved processing metadata: %s", metadata_path)
 
 
 async def main():
@@ -351,8 +1020,8 @@ print(result)
 '''
     }
     
-    processor = BatchProcessor()
-    results = await processor.process_examples([test_example])
+    async with BatchProcessor() as processor:
+        results = await processor.process_examples([test_example])
     
     print("Processing complete!")
     for result in results:
@@ -31,7 +31,9 @@ sphinx_gallery_conf = {
     'expected_failing_examples': [],
     'abort_on_example_error': False,
     'matplotlib_animations': False,
-    'compress_images': ['images', 'thumbnails'],
+    # Compressing every image with optipng is the slowest part of a rebuild,
+    # so only do it when asked (e.g. in CI): PYHC_GALLERY_COMPRESS_IMAGES=1
+    'compress_images': ('images', 'thumbnails') if os.environ.get('PYHC_GALLERY_COMPRESS_IMAGES') else (),
     'compress_images_args': ['-quality', '85'],
 }
 
@@ -13,34 +13,116 @@ It will:
 
 import asyncio
 import os
+import re
 import shutil
+import socket
 import subprocess
 import webbrowser
 import time
+from functools import lru_cache, partial
+from importlib.util import find_spec
 from pathlib import Path
+from string import Template
 import http.server
-import socketserver
 import threading
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from gallery_server import PooledHTTPServer
 from pyhc_gallery_scraper import DocumentationScraper
 
 
+# Title, description and first import of a gallery example file
+_TITLE_RE = re.compile(r'"""\s*\n=+\n(.+?)\n=+', re.S)
+_DESC_RE = re.compile(r'=+\n[^\n]+\n=+\n\n(.+?)\n', re.S)
+_IMPORT_RE = re.compile(r'^import', re.M)
+
+# Characters dropped from, and whitespace runs replaced in, example filenames
+_FN_STRIP = re.compile(r'[^a-zA-Z0-9\s]')
+_FN_SPACE = re.compile(r'\s+')
+
+
+# Sphinx-Gallery source for a scraped example
+_EXAMPLE_TEMPLATE = Template('''"""
+$bar
+$title
+$bar
+
+$description
+
+**Source:** $source_url
+
+**Package:** $package
+
+**Dependencies:** $dependencies
+
+This example was automatically scraped from $package documentation.
+"""
+
+##############################################################################
+# $title
+# 
+# This example demonstrates $package functionality
+
+$code
+
+##############################################################################
+# Example complete!
+#
+# This example was automatically processed by the PyHC Gallery automation system.
+''')
+
+
+@lru_cache(maxsize=None)
+def _title_bar(title_length: int) -> str:
+    """Underline/overline for a docstring title of the given length"""
+    return "=" * max(title_length, 40)
+
+
+def _write_text(path, content: str) -> bool:
+    """Write a text file through a large buffer so it is flushed in one go
+    
+    Files whose content is unchanged are left alone, keeping their mtime so
+    Sphinx-Gallery does not re-execute them. Returns whether it wrote.
+    """
+    data = content.encode('utf-8')
+    try:
+        # The size check skips reading files that have clearly changed
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'wb', buffering=1 << 20) as f:
+        f.write(data)
+    return True
+
+
 class LocalGalleryBuilder:
     """Build and serve a local PyHC gallery"""
     
-    def __init__(self, gallery_dir: str = "local_gallery"):
+    # Set once install_requirements has verified the build packages
+    _reqs_checked = False
+    
+    def __init__(self, gallery_dir: str = "local_gallery", max_concurrent_scrapes: int = 8):
         self.gallery_dir = Path(gallery_dir)
         self.examples_dir = self.gallery_dir / "examples"
         self.build_dir = self.gallery_dir / "_build"
         self.port = 8000
+        self.httpd = None
+        # Caps how many packages are scraped at once
+        self._sem = asyncio.Semaphore(max_concurrent_scrapes)
     
     def setup_gallery_structure(self):
         """Create the gallery directory structure"""
         print("Setting up gallery structure...")
         
-        # Create directories
-        self.gallery_dir.mkdir(exist_ok=True)
-        self.examples_dir.mkdir(exist_ok=True)
+        # Create directories (parents=True also creates gallery_dir)
+        self.examples_dir.mkdir(parents=True, exist_ok=True)
         (self.gallery_dir / "_static").mkdir(exist_ok=True)
         
         # Create Sphinx configuration
@@ -89,7 +171,9 @@ sphinx_gallery_conf = {
     'expected_failing_examples': [],
     'abort_on_example_error': False,
     'matplotlib_animations': False,
-    'compress_images': ['images', 'thumbnails'],
+    # Compressing every image with optipng is the slowest part of a rebuild,
+    # so only do it when asked (e.g. in CI): PYHC_GALLERY_COMPRESS_IMAGES=1
+    'compress_images': ('images', 'thumbnails') if os.environ.get('PYHC_GALLERY_COMPRESS_IMAGES') else (),
     'compress_images_args': ['-quality', '85'],
 }
 
@@ -117,8 +201,7 @@ import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 '''
         
-        with open(self.gallery_dir / "conf.py", 'w') as f:
-            f.write(conf_content)
+        _write_text(self.gallery_dir / "conf.py", conf_content)
     
     def create_index_file(self):
         """Create the main index.rst file"""
@@ -170,8 +253,7 @@ Indices and tables
 * :ref:`search`
 '''
         
-        with open(self.gallery_dir / "index.rst", 'w') as f:
-            f.write(index_content)
+        _write_text(self.gallery_dir / "index.rst", index_content)
     
     def create_examples_readme(self):
         """Create README for examples directory"""
@@ -192,31 +274,41 @@ Examples are prefixed with their source package name and include
 metadata about processing confidence and source URLs.
 '''
         
-        with open(self.examples_dir / "README.txt", 'w') as f:
-            f.write(readme_content)
+        _write_text(self.examples_dir / "README.txt", readme_content)
     
     async def scrape_sample_examples(self, limit_per_package: int = 2):
         """Scrape a few examples for demonstration"""
         print("Scraping sample examples...")
         
-        async with DocumentationScraper(str(self.examples_dir)) as scraper:
+        async with DocumentationScraper(str(self.examples_dir),
+                                        cache_dir=str(self.gallery_dir / ".scrape_cache")) as scraper:
             all_examples = []
             
-            # Scrape from each package with limits for demo
-            from pyhc_gallery_scraper import PyHCPackageRegistry
-            for package in PyHCPackageRegistry.PACKAGES[:3]:  # Just first 3 packages
-                print(f"  Scraping {package.name}...")
+            async def _one(package):
                 try:
-                    examples = await scraper.scrape_package(package)
-                    if examples:
-                        # Limit examples per package for demo
-                        limited_examples = examples[:limit_per_package]
-                        all_examples.extend(limited_examples)
-                        print(f"    Found {len(limited_examples)} examples")
-                    else:
-                        print(f"    No examples found")
+                    async with self._sem:
+                        print(f"  Scraping {package.name}...")
+                        return package, await scraper.scrape_package(package)
                 except Exception as e:
-                    print(f"    Error: {e}")
+                    return package, e
+            
+            # Scrape the packages concurrently, with limits for demo
+            from pyhc_gallery_scraper import PyHCPackageRegistry
+            results = await asyncio.gather(
+                *(_one(package) for package in PyHCPackageRegistry.PACKAGES[:3])  # Just first 3 packages
+            )
+            
+            for package, examples in results:
+                print(f"  {package.name}:")
+                if isinstance(examples, Exception):
+                    print(f"    Error: {examples}")
+                elif examples:
+                    # Limit examples per package for demo
+                    limited_examples = examples[:limit_per_package]
+                    all_examples.extend(limited_examples)
+                    print(f"    Found {len(limited_examples)} examples")
+                else:
+                    print(f"    No examples found")
             
             # Save examples in gallery format
             if all_examples:
@@ -229,53 +321,38 @@ metadata about processing confidence and source URLs.
         return len(all_examples) if all_examples else 3
     
     async def save_gallery_examples(self, examples):
-        """Save examples in gallery format"""
+        """Save examples in gallery format, writing the files concurrently"""
+        jobs = []
         for i, example in enumerate(examples):
             # Create safe filename
             package = example.package
             safe_title = self.sanitize_filename(example.title)
             filename = f"{package}_{i+1:02d}_{safe_title}.py"
             
-            # Format for gallery
-            content = self.format_example_for_gallery(example)
-            
-            # Save file
+            # Format for gallery and save file in a worker thread
             filepath = self.examples_dir / filename
-            with open(filepath, 'w') as f:
-                f.write(content)
+            jobs.append(asyncio.to_thread(self._write_gallery_example, filepath, example))
+        
+        written = await asyncio.gather(*jobs)
+        unchanged = written.count(False)
+        if unchanged:
+            print(f"  Reused {unchanged} unchanged example files")
+    
+    def _write_gallery_example(self, filepath, example):
+        """Format one example for the gallery and write it if it changed"""
+        return _write_text(filepath, self.format_example_for_gallery(example))
     
     def format_example_for_gallery(self, example):
         """Format example for Sphinx-Gallery"""
-        title_line = "=" * max(len(example.title), 40)
-        
-        return f'''"""
-{title_line}
-{example.title}
-{title_line}
-
-{example.description}
-
-**Source:** {example.source_url}
-
-**Package:** {example.package}
-
-**Dependencies:** {', '.join(example.dependencies) if example.dependencies else 'None specified'}
-
-This example was automatically scraped from {example.package} documentation.
-"""
-
-##############################################################################
-# {example.title}
-# 
-# This example demonstrates {example.package} functionality
-
-{example.code}
-
-##############################################################################
-# Example complete!
-#
-# This example was automatically processed by the PyHC Gallery automation system.
-'''
+        return _EXAMPLE_TEMPLATE.substitute(
+            bar=_title_bar(len(example.title)),
+            title=example.title,
+            description=example.description,
+            source_url=example.source_url,
+            package=example.package,
+            dependencies=', '.join(example.dependencies) if example.dependencies else 'None specified',
+            code=example.code,
+        )
     
     def create_demo_examples(self):
         """Create demo examples if scraping fails"""
@@ -488,12 +565,14 @@ print(f"Minimum Bz: {B_z.min():.1f} nT at minute {np.argmin(B_z)}")
             }
         ]
         
+        unchanged = 0
         for demo in demo_examples:
-            filepath = self.examples_dir / demo['filename']
-            with open(filepath, 'w') as f:
-                f.write(demo['content'])
+            if not _write_text(self.examples_dir / demo['filename'], demo['content']):
+                unchanged += 1
         
         print("✅ Created 3 demo examples")
+        if unchanged:
+            print(f"  Reused {unchanged} unchanged demo files")
     
     def build_gallery(self):
         """Build the Sphinx gallery"""
@@ -507,15 +586,16 @@ print(f"Minimum Bz: {B_z.min():.1f} nT at minute {np.argmin(B_z)}")
             # Install required packages if needed
             self.install_requirements()
             
-            # Run Sphinx build
-            cmd = ['sphinx-build', '-b', 'html', '.', '_build/html']
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # Run Sphinx build; -j parallelizes Sphinx's read/write phases across
+            # cores (Sphinx-Gallery still executes the examples one at a time)
+            cmd = ['sphinx-build', '-j', 'auto', '-q', '-b', 'html', '.', '_build/html']
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
             
             if result.returncode == 0:
                 print("✅ Gallery built successfully!")
                 return True
             else:
-                print(f"❌ Build failed: {result.stderr}")
+                print(f"❌ Build failed: {result.stdout}")
                 # Try simpler build
                 return self.build_simple_gallery()
         
@@ -535,13 +615,21 @@ print(f"Minimum Bz: {B_z.min():.1f} nT at minute {np.argmin(B_z)}")
             'numpy'
         ]
         
-        for package in required_packages:
+        if LocalGalleryBuilder._reqs_checked:
+            return
+        
+        # find_spec locates a module without importing it
+        missing = [p for p in required_packages if find_spec(p.replace('-', '_')) is None]
+        if missing:
+            print(f"Installing {', '.join(missing)}...")
+            # pip's progress output is discarded; only stderr is kept for errors
             try:
-                __import__(package.replace('-', '_'))
-            except ImportError:
-                print(f"Installing {package}...")
-                subprocess.run(['pip', 'install', package], 
-                             capture_output=True, check=True)
+                subprocess.run(['pip', 'install', *missing], stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, check=True)
+            except subprocess.CalledProcessError as e:
+                print(f"❌ pip install failed: {e.stderr.decode(errors='replace')}")
+                raise
+        LocalGalleryBuilder._reqs_checked = True
     
     def build_simple_gallery(self):
         """Build a simple HTML gallery if Sphinx fails"""
@@ -551,7 +639,7 @@ print(f"Minimum Bz: {B_z.min():.1f} nT at minute {np.argmin(B_z)}")
         build_html_dir.mkdir(parents=True, exist_ok=True)
         
         # Create simple index.html
-        html_content = '''<!DOCTYPE html>
+        parts = ['''<!DOCTYPE html>
 <html>
 <head>
     <title>Local PyHC Gallery</title>
@@ -583,57 +671,42 @@ print(f"Minimum Bz: {B_z.min():.1f} nT at minute {np.argmin(B_z)}")
         </div>
         
         <div class="examples">
-'''
+''']
         
         # Add example cards
-        example_files = list(self.examples_dir.glob("*.py"))
-        for i, example_file in enumerate(example_files):
-            with open(example_file, 'r') as f:
+        with os.scandir(self.examples_dir) as it:
+            entries = [entry for entry in it if entry.name.endswith('.py')]
+        for i, entry in enumerate(entries):
+            with open(entry.path, 'r', buffering=1 << 20) as f:
                 content = f.read()
             
-            # Extract title from docstring
-            lines = content.split('\n')
-            title = "Example"
-            for line in lines:
-                if line.strip() and not line.startswith('"""') and not line.startswith('#'):
-                    if '=' in line and len(line.strip()) > 10:
-                        title = line.replace('=', '').strip()
-                        break
-            
-            # Extract description
-            in_docstring = False
-            description = ""
-            for line in lines:
-                if '"""' in line:
-                    if in_docstring:
-                        break
-                    in_docstring = True
-                    continue
-                if in_docstring and line.strip():
-                    if not any(char in line for char in ['=', '*', '-']) and len(line.strip()) > 20:
-                        description = line.strip()
-                        break
+            # Extract title and description from the docstring
+            match = _TITLE_RE.search(content)
+            title = match.group(1).strip() if match else "Example"
+            match = _DESC_RE.search(content)
+            description = match.group(1).strip() if match else ""
             
             # Show first part of code
-            code_start = content.find('import')
-            if code_start > 0:
+            match = _IMPORT_RE.search(content)
+            if match:
+                code_start = match.start()
                 code_preview = content[code_start:code_start+400] + "..."
             else:
                 code_preview = content[:400] + "..."
             
-            html_content += f'''
+            parts.append(f'''
             <div class="example-card">
                 <h3>{title}</h3>
                 <p>{description}</p>
                 <div class="example-code">{code_preview}</div>
                 <div class="metadata">
-                    File: {example_file.name}<br>
+                    File: {entry.name}<br>
                     Size: {len(content)} characters
                 </div>
             </div>
-            '''
+            ''')
         
-        html_content += '''
+        parts.append('''
         </div>
         
         <div style="margin-top: 40px; text-align: center; color: #666;">
@@ -651,10 +724,9 @@ print(f"Minimum Bz: {B_z.min():.1f} nT at minute {np.argmin(B_z)}")
     </div>
 </body>
 </html>
-'''
+''')
         
-        with open(build_html_dir / "index.html", 'w') as f:
-            f.write(html_content)
+        _write_text(build_html_dir / "index.html", ''.join(parts))
         
         print("✅ Simple HTML gallery created")
         return True
@@ -667,44 +739,66 @@ print(f"Minimum Bz: {B_z.min():.1f} nT at minute {np.argmin(B_z)}")
             print("❌ Gallery not built yet")
             return False
         
-        # Find available port
-        for port in range(8000, 8010):
-            try:
-                os.chdir(build_dir)
-                
-                class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-                    def log_message(self, format, *args):
-                        pass  # Suppress log messages
-                
-                httpd = socketserver.TCPServer(("", port), QuietHTTPRequestHandler)
-                self.port = port
-                
-                def serve():
-                    print(f"🌐 Gallery server started at http://localhost:{port}")
-                    print("   Press Ctrl+C to stop the server")
-                    httpd.serve_forever()
-                
-                # Start server in background thread
-                server_thread = threading.Thread(target=serve, daemon=True)
-                server_thread.start()
-                
-                # Open browser
-                time.sleep(1)
-                webbrowser.open(f"http://localhost:{port}")
-                
-                return True
-                
-            except OSError:
-                continue
+        port = self._find_port()
+        if port is None:
+            print("❌ Could not find available port")
+            return False
+        
+        class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+            # Give up on connections that never send a request (e.g. browser
+            # preconnects) so they don't hold a pool worker forever
+            timeout = 5
+            
+            def log_message(self, format, *args):
+                pass  # Suppress log messages
         
-        print("❌ Could not find available port")
-        return False
+        # Serve build_dir directly rather than chdir'ing the whole process
+        handler_cls = partial(QuietHTTPRequestHandler, directory=str(build_dir))
+        
+        # Threaded so a browser's idle keep-alive connection can't
+        # block the asset requests queued behind it
+        httpd = PooledHTTPServer(("", port), handler_cls)
+        self.httpd = httpd
+        self.port = port
+        
+        def serve():
+            print(f"🌐 Gallery server started at http://localhost:{port}")
+            print("   Press Ctrl+C to stop the server")
+            httpd.serve_forever()
+        
+        # Start server in background thread
+        server_thread = threading.Thread(target=serve, daemon=True)
+        server_thread.start()
+        
+        # Open browser
+        time.sleep(1)
+        webbrowser.open(f"http://localhost:{port}")
+        
+        return True
+    
+    def stop_server(self):
+        """Stop the server started by serve_gallery"""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+    
+    def _find_port(self, start: int = 8000, end: int = 8010):
+        """Return the first port in [start, end) that can be bound, or None"""
+        for port in range(start, end):
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                # Same option the server sets, so ports in TIME_WAIT count as free
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                try:
+                    sock.bind(("", port))
+                except OSError:
+                    continue
+                return port
+        return None
     
     def sanitize_filename(self, title: str) -> str:
         """Convert title to safe filename"""
-        import re
-        sanitized = re.sub(r'[^a-zA-Z0-9\s]', '', title)
-        return re.sub(r'\s+', '_', sanitized).lower()[:30]
+        return _FN_SPACE.sub('_', _FN_STRIP.sub('', title)).lower()[:30]
 
 
 async def main():
@@ -736,12 +830,15 @@ async def main():
                 print("• Processed and formatted for gallery display")
                 print("• Ready-to-use automation system")
                 
-                # Keep server running
+                # Keep server running until Ctrl+C. asyncio.run turns the
+                # interrupt into a cancellation of this task, which ends the
+                # wait on an event that is never set
                 try:
-                    while True:
-                        time.sleep(1)
-                except KeyboardInterrupt:
+                    await asyncio.Event().wait()
+                except (KeyboardInterrupt, asyncio.CancelledError):
                     print("\n\n👋 Gallery server stopped")
+                finally:
+                    builder.stop_server()
             else:
                 print("❌ Failed to start web server")
         else:
@@ -754,4 +851,7 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
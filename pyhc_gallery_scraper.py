@@ -7,25 +7,94 @@ and converts them to the gallery format for inclusion in the PyHC gallery.
 """
 
 import asyncio
+import gzip
+import hashlib
 import logging
 import re
 import json
 import os
+import random
+import sys
+import time
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from importlib.util import find_spec
 
 import aiohttp
 import aiofiles
 from bs4 import BeautifulSoup
-import nbformat
-from nbconvert import PythonExporter
-import requests
+import lxml.html
+from lxml import etree
 from urllib.parse import urljoin, urlparse
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# aiohttp can only decode brotli responses when a brotli binding is installed
+_ACCEPT_ENCODING = ('gzip, deflate, br' if find_spec('brotli') or find_spec('brotlicffi')
+                    else 'gzip, deflate')
+
+
+def _code_xpath(tag: str, cls: str, fallback: str = '.') -> etree.XPath:
+    """Compiled XPath for the code inside `tag` elements with class `cls`
+    
+    Yields, per matching container in document order, its first <code>
+    descendant, or the `fallback` path relative to the container when it
+    has no <code>.
+    """
+    container = f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+    return etree.XPath(f"{container}/descendant::code[1] | {container}[not(.//code)]/{fallback}")
+
+
+# Code in Sphinx / nbsphinx output
+_HIGHLIGHT_PYTHON_CODE_XPATH = _code_xpath('div', 'highlight-python')
+_LITERAL_BLOCK_CODE_XPATH = _code_xpath('pre', 'literal-block')
+_NOTEBOOK_CELL_CODE_XPATH = _code_xpath('div', 'highlight-python', fallback='descendant::pre[1]')
+_NOTEBOOK_INPUT_CODE_XPATH = _code_xpath('div', 'input', fallback='descendant::pre[1]')
+
+# hrefs of links to Sphinx-Gallery example pages (plot_*.html)
+_PLOT_LINK_XPATH = etree.XPath(
+    '//a[contains(@href, "plot_") and '
+    'substring(@href, string-length(@href) - 4) = ".html"]/@href'
+)
+
+# Import statements, matched anywhere in a block of code
+_IMPORT_RE = re.compile(r'^[ \t]*(?:from[ \t]+(\S+)|import[ \t]+(\S+))', re.MULTILINE)
+
+# Header of a saved example; str.format fields are filled per example
+_GALLERY_HEADER_TEMPLATE = '''# coding: utf-8
+"""
+{title_line}
+{title}
+{title_line}
+
+{description}
+
+This example was automatically scraped from {package} documentation.
+Source: {source_url}
+
+Dependencies: {dependencies}
+"""
+
+##############################################################################
+# This example demonstrates {package} functionality
+#
+# Auto-generated from: {source_url}
+
+'''
+
+_FILENAME_STRIP_RE = re.compile(r'[^a-zA-Z0-9\s]')
+_FILENAME_SPACE_RE = re.compile(r'\s+')
+
+
+@dataclass(slots=True)
 class PackageInfo:
     """Information about a PyHC package"""
     name: str
@@ -37,7 +106,7 @@ class PackageInfo:
     priority: int = 1  # Higher priority packages scraped first
 
 
-@dataclass
+@dataclass(slots=True)
 class CodeExample:
     """A scraped code example"""
     title: str
@@ -49,6 +118,37 @@ class CodeExample:
     dependencies: List[str]
     plots_generated: bool = False
     last_updated: str = ""
+    
+    def __post_init__(self):
+        # The same few package and category names repeat across every example
+        self.package = sys.intern(self.package)
+        self.category = sys.intern(self.category)
+
+
+# Common category mappings, checked in order; the first keyword found wins
+_CATEGORY_KEYWORDS = (
+    ('map', 'maps'),
+    ('time', 'time_series'),
+    ('plot', 'plotting'),
+    ('data', 'data_acquisition'),
+    ('coord', 'coordinates'),
+    ('getting_started', 'basic'),
+    ('diagnostic', 'diagnostics'),
+)
+
+
+@lru_cache(maxsize=2048)
+def _category_for_url(url: str) -> str:
+    """Category for an example URL, cached across scrapes of the same pages"""
+    path = urlparse(url).path.lower()
+    for keyword, category in _CATEGORY_KEYWORDS:
+        if keyword in path:
+            return category
+    return 'general'
+
+
+class _RetryableStatus(Exception):
+    """Raised inside DocumentationScraper._fetch for a status worth retrying"""
 
 
 class PyHCPackageRegistry:
@@ -113,14 +213,41 @@ class PyHCPackageRegistry:
             priority=2
         )
     ]
+    
+    @classmethod
+    def by_name(cls, name: str) -> Optional[PackageInfo]:
+        """Look up a registered package by name"""
+        # A scan rather than a cached map, so edits to PACKAGES are always seen
+        return next((package for package in cls.PACKAGES if package.name == name), None)
 
 
 class DocumentationScraper:
-    """Main scraper class for extracting examples from documentation"""
+    """Main scraper class for extracting examples from documentation
+    
+    If cache_dir is given, fetched pages are cached on disk. Cached pages
+    younger than their TTL are served without a request; older ones are
+    revalidated with If-None-Match / If-Modified-Since so unchanged pages
+    come back as a bodyless 304.
+    """
     
-    def __init__(self, output_dir: str = "scraped_examples"):
+    # Gallery/notebook index pages change whenever examples are added, so
+    # they are revalidated sooner than individual example pages
+    INDEX_PAGE_TTL = 60 * 60
+    EXAMPLE_PAGE_TTL = 24 * 60 * 60
+    
+    # Requests in flight to any one documentation host
+    MAX_REQUESTS_PER_HOST = 15
+    
+    # Rate limiting and gateway errors are usually transient
+    RETRY_STATUSES = frozenset({429, 502, 503, 504})
+    MAX_FETCH_ATTEMPTS = 4
+    
+    def __init__(self, output_dir: str = "scraped_examples", cache_dir: Optional[str] = None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.session = None
         self.logger = self._setup_logging()
     
@@ -132,9 +259,24 @@ class DocumentationScraper:
         return logging.getLogger(__name__)
     
     async def __aenter__(self):
+        # One semaphore per host, so packages on different hosts don't
+        # compete for the same request slots
+        self._host_sems: Dict[str, asyncio.Semaphore] = {}
+        # All pages of a package share a host, so keep connections (and
+        # their TLS sessions) alive and cache DNS lookups between requests
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=20,
+            ttl_dns_cache=300,
+            keepalive_timeout=60
+        )
         self.session = aiohttp.ClientSession(
+            connector=connector,
             timeout=aiohttp.ClientTimeout(total=30),
-            headers={'User-Agent': 'PyHC-Gallery-Scraper/1.0'}
+            headers={
+                'User-Agent': 'PyHC-Gallery-Scraper/1.0',
+                'Accept-Encoding': _ACCEPT_ENCODING
+            }
         )
         return self
     
@@ -142,21 +284,155 @@ class DocumentationScraper:
         if self.session:
             await self.session.close()
     
+    def _cache_path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha1(url.encode()).hexdigest()}.json.gz"
+    
+    def _read_cache_entry(self, url: str) -> Optional[Dict]:
+        try:
+            with gzip.open(self._cache_path(url), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, EOFError, ValueError):
+            return None
+    
+    def _write_cache_entry(self, url: str, entry: Dict):
+        # HTML compresses well, and entries are written far less often than read
+        with gzip.open(self._cache_path(url), 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(entry, f)
+    
+    async def _fetch_text(self, url: str, max_age: float = EXAMPLE_PAGE_TTL) -> Optional[str]:
+        """Fetch a page's HTML, going through the HTTP cache when enabled
+        
+        Returns None if the page could not be retrieved.
+        """
+        body, _ = await self._fetch(url, max_age)
+        return body
+    
+    async def _fetch_tree(self, url: str, max_age: float = EXAMPLE_PAGE_TTL) -> Optional[lxml.html.HtmlElement]:
+        """Fetch a page and parse it with lxml, going through the HTTP cache
+        
+        Downloaded pages are fed to lxml's incremental parser chunk by chunk,
+        so parsing overlaps the transfer. Returns None if the page could not
+        be retrieved.
+        """
+        body, tree = await self._fetch(url, max_age, parse=True)
+        if tree is None and body:
+            tree = lxml.html.document_fromstring(body)
+        return tree
+    
+    async def _fetch(self, url: str, max_age: float,
+                     parse: bool = False) -> Tuple[Optional[str], Optional[lxml.html.HtmlElement]]:
+        """Return a page's body and, for a streamed parse, its tree
+        
+        The tree is only built here when the body is downloaded with parse
+        set; cached bodies come back without one.
+        """
+        entry = self._read_cache_entry(url) if self.cache_dir else None
+        if entry and time.time() - entry['fetched_at'] < max_age:
+            return entry['body'], None
+        
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        # Transient failures are retried with exponential backoff; the last
+        # attempt's error (or error status) is passed on as before
+        for attempt in range(self.MAX_FETCH_ATTEMPTS):
+            last_attempt = attempt == self.MAX_FETCH_ATTEMPTS - 1
+            try:
+                return await self._request(url, headers, entry, parse, retry_status=not last_attempt)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError, _RetryableStatus) as e:
+                if last_attempt:
+                    raise
+                delay = 0.5 * 2 ** attempt + random.uniform(0, 0.5)
+                self.logger.warning(f"Retrying {url} in {delay:.1f}s after {str(e) or type(e).__name__}")
+                await asyncio.sleep(delay)
+    
+    async def _request(self, url: str, headers: Dict[str, str], entry: Optional[Dict], parse: bool,
+                       retry_status: bool) -> Tuple[Optional[str], Optional[lxml.html.HtmlElement]]:
+        """Make one request for _fetch and update the cache from its response"""
+        host = urlparse(url).netloc
+        sem = self._host_sems.get(host)
+        if sem is None:
+            sem = self._host_sems[host] = asyncio.Semaphore(self.MAX_REQUESTS_PER_HOST)
+        
+        async with sem, self.session.get(url, headers=headers) as response:
+            if response.status == 304 and entry:
+                entry['fetched_at'] = time.time()
+                self._write_cache_entry(url, entry)
+                return entry['body'], None
+            
+            if retry_status and response.status in self.RETRY_STATUSES:
+                raise _RetryableStatus(f"HTTP {response.status}")
+            
+            if response.status != 200:
+                return None, None
+            
+            # PyHC docs are UTF-8; decoding directly skips aiohttp's charset
+            # detection when the server doesn't declare one
+            encoding = response.charset or 'utf-8'
+            tree = None
+            if parse:
+                parser = lxml.html.HTMLParser(encoding=encoding)
+                chunks = []
+                async for chunk in response.content.iter_chunked(65536):
+                    parser.feed(chunk)
+                    chunks.append(chunk)
+                tree = parser.close()
+                body = b''.join(chunks).decode(encoding, errors='replace')
+            else:
+                body = (await response.read()).decode(encoding, errors='replace')
+            
+            if self.cache_dir:
+                self._write_cache_entry(url, {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time.time(),
+                    'body': body
+                })
+            
+            return body, tree
+    
     async def scrape_all_packages(self) -> List[CodeExample]:
         """Scrape examples from all registered packages"""
-        all_examples = []
-        
-        for package in sorted(PyHCPackageRegistry.PACKAGES, key=lambda p: p.priority):
+        packages = sorted(PyHCPackageRegistry.PACKAGES, key=lambda p: p.priority)
+        for package in packages:
             self.logger.info(f"Scraping {package.name}...")
-            try:
-                examples = await self.scrape_package(package)
-                all_examples.extend(examples)
-                self.logger.info(f"Found {len(examples)} examples from {package.name}")
-            except Exception as e:
-                self.logger.error(f"Failed to scrape {package.name}: {e}")
+        
+        results = await asyncio.gather(
+            *(self.scrape_package(package) for package in packages),
+            return_exceptions=True
+        )
+        
+        all_examples = []
+        for package, examples in zip(packages, results):
+            if isinstance(examples, Exception):
+                self.logger.error(f"Failed to scrape {package.name}: {examples}")
+                continue
+            all_examples.extend(examples)
+            self.logger.info(f"Found {len(examples)} examples from {package.name}")
         
         return all_examples
     
+    async def _gather_examples(self, extract, package: PackageInfo, urls: List[str]) -> List[CodeExample]:
+        """Run `extract(package, url)` for every URL concurrently
+        
+        Requests are bounded per host in _fetch. Failed and empty
+        extractions are logged or dropped; input order is kept.
+        """
+        results = await asyncio.gather(*(extract(package, url) for url in urls), return_exceptions=True)
+        
+        examples = []
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Failed to extract example from {url}: {result}")
+            elif result:
+                examples.append(result)
+        return examples
+    
     async def scrape_package(self, package: PackageInfo) -> List[CodeExample]:
         """Scrape examples from a specific package"""
         if package.doc_type == "sphinx-gallery":
@@ -177,32 +453,19 @@ class DocumentationScraper:
         gallery_url = f"{package.docs_url}/en/stable/generated/gallery/index.html"
         
         try:
-            async with self.session.get(gallery_url) as response:
-                if response.status != 200:
-                    self.logger.warning(f"Could not access gallery index: {gallery_url}")
-                    return []
-                
-                content = await response.text()
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Find all example links in the gallery
-                example_links = soup.find_all('a', href=True)
-                example_urls = []
-                
-                for link in example_links:
-                    href = link.get('href', '')
-                    if 'plot_' in href and href.endswith('.html'):
-                        full_url = urljoin(gallery_url, href)
-                        example_urls.append(full_url)
-                
-                # Scrape individual examples
-                for url in example_urls[:10]:  # Limit for testing
-                    try:
-                        example = await self._extract_sphinx_gallery_example(package, url)
-                        if example:
-                            examples.append(example)
-                    except Exception as e:
-                        self.logger.error(f"Failed to extract example from {url}: {e}")
+            tree = await self._fetch_tree(gallery_url, max_age=self.INDEX_PAGE_TTL)
+            if tree is None:
+                self.logger.warning(f"Could not access gallery index: {gallery_url}")
+                return []
+            
+            # Find all example links in the gallery
+            example_urls = [urljoin(gallery_url, href) for href in _PLOT_LINK_XPATH(tree)]
+            
+            # Scrape individual examples
+            examples = await self._gather_examples(
+                self._extract_sphinx_gallery_example, package,
+                example_urls[:10]  # Limit for testing
+            )
         
         except Exception as e:
             self.logger.error(f"Failed to scrape gallery index: {e}")
@@ -211,60 +474,50 @@ class DocumentationScraper:
     
     async def _extract_sphinx_gallery_example(self, package: PackageInfo, url: str) -> Optional[CodeExample]:
         """Extract code example from a Sphinx-Gallery page"""
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                return None
-            
-            content = await response.text()
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Extract title
-            title_elem = soup.find('h1')
-            title = title_elem.text.strip() if title_elem else "Untitled Example"
-            
-            # Extract description (first paragraph)
-            desc_elem = soup.find('p')
-            description = desc_elem.text.strip() if desc_elem else ""
-            
-            # Extract Python code blocks
-            code_blocks = soup.find_all('div', class_='highlight-python')
-            if not code_blocks:
-                code_blocks = soup.find_all('pre', class_='literal-block')
-            
-            code_parts = []
-            for block in code_blocks:
-                code_elem = block.find('code') or block
-                if code_elem:
-                    code_parts.append(code_elem.text.strip())
-            
-            if not code_parts:
-                return None
-            
-            # Combine code blocks
-            code = '\n\n##############################################################################\n# \n\n'.join(code_parts)
-            
-            # Extract dependencies from imports
-            dependencies = self._extract_dependencies(code)
-            
-            # Determine category from URL
-            category = self._extract_category_from_url(url)
-            
-            return CodeExample(
-                title=title,
-                description=description,
-                code=code,
-                package=package.name,
-                source_url=url,
-                category=category,
-                dependencies=dependencies,
-                plots_generated=True,  # Sphinx-Gallery typically generates plots
-                last_updated=datetime.now().isoformat()
-            )
+        content = await self._fetch_text(url)
+        if not content:
+            return None
+        
+        tree = lxml.html.document_fromstring(content)
+        
+        # Extract title
+        title_elem = tree.find('.//h1')
+        title = title_elem.text_content().strip() if title_elem is not None else "Untitled Example"
+        
+        # Extract description (first paragraph)
+        desc_elem = tree.find('.//p')
+        description = desc_elem.text_content().strip() if desc_elem is not None else ""
+        
+        # Extract Python code blocks
+        code_elems = _HIGHLIGHT_PYTHON_CODE_XPATH(tree) or _LITERAL_BLOCK_CODE_XPATH(tree)
+        code_parts = [code_elem.text_content().strip() for code_elem in code_elems]
+        
+        if not code_parts:
+            return None
+        
+        # Combine code blocks
+        code = '\n\n##############################################################################\n# \n\n'.join(code_parts)
+        
+        # Extract dependencies from imports
+        dependencies = self._extract_dependencies(code)
+        
+        # Determine category from URL
+        category = self._extract_category_from_url(url)
+        
+        return CodeExample(
+            title=title,
+            description=description,
+            code=code,
+            package=package.name,
+            source_url=url,
+            category=category,
+            dependencies=dependencies,
+            plots_generated=True,  # Sphinx-Gallery typically generates plots
+            last_updated=datetime.now().isoformat()
+        )
     
     async def _scrape_nbsphinx(self, package: PackageInfo) -> List[CodeExample]:
         """Scrape nbsphinx documentation (like PlasmaPy)"""
-        examples = []
-        
         # Try to find notebook directory listing
         notebook_urls = [
             f"{package.docs_url}/en/stable/notebooks/getting_started/",
@@ -272,90 +525,142 @@ class DocumentationScraper:
             f"{package.docs_url}/en/stable/notebooks/dispersion/"
         ]
         
-        for base_url in notebook_urls:
-            try:
-                async with self.session.get(base_url) as response:
-                    if response.status != 200:
-                        continue
-                    
-                    content = await response.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # Find notebook links
-                    notebook_links = soup.find_all('a', href=True)
-                    for link in notebook_links:
-                        href = link.get('href', '')
-                        if href.endswith('.html') and not href.startswith('http'):
-                            notebook_url = urljoin(base_url, href)
-                            try:
-                                example = await self._extract_notebook_example(package, notebook_url)
-                                if example:
-                                    examples.append(example)
-                            except Exception as e:
-                                self.logger.error(f"Failed to extract notebook from {notebook_url}: {e}")
+        async def _notebook_links(base_url):
+            tree = await self._fetch_tree(base_url, max_age=self.INDEX_PAGE_TTL)
+            if tree is None:
+                return []
             
-            except Exception as e:
-                self.logger.error(f"Failed to access notebook directory {base_url}: {e}")
+            # Find notebook links
+            links = []
+            for link in tree.iterfind('.//a[@href]'):
+                href = link.get('href')
+                if href.endswith('.html') and not href.startswith('http'):
+                    links.append(urljoin(base_url, href))
+            return links
+        
+        # Read every directory page at once, then extract all their
+        # notebooks in a single concurrent batch
+        results = await asyncio.gather(
+            *(_notebook_links(base_url) for base_url in notebook_urls),
+            return_exceptions=True
+        )
+        
+        notebook_page_urls = []
+        for base_url, links in zip(notebook_urls, results):
+            if isinstance(links, Exception):
+                self.logger.error(f"Failed to access notebook directory {base_url}: {links}")
+            else:
+                notebook_page_urls.extend(links)
+        
+        examples = await self._gather_examples(
+            self._extract_notebook_example, package, notebook_page_urls
+        )
         
         return examples[:5]  # Limit for testing
     
     async def _extract_notebook_example(self, package: PackageInfo, url: str) -> Optional[CodeExample]:
-        """Extract code example from an nbsphinx-generated page"""
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                return None
-            
-            content = await response.text()
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Extract title
-            title_elem = soup.find('h1')
-            title = title_elem.text.strip() if title_elem else "Untitled Notebook"
-            
-            # Extract description from first text paragraph
-            paragraphs = soup.find_all('p')
-            description = ""
-            for p in paragraphs:
-                if p.text.strip() and not p.text.startswith('This page was generated'):
-                    description = p.text.strip()
-                    break
-            
-            # Extract code cells
-            code_blocks = soup.find_all('div', class_='highlight-python')
-            if not code_blocks:
-                code_blocks = soup.find_all('div', class_='input')
-            
-            code_parts = []
-            for block in code_blocks:
-                code_elem = block.find('code') or block.find('pre')
-                if code_elem:
-                    code_text = code_elem.text.strip()
-                    if code_text and not code_text.startswith('['):  # Skip output cells
-                        code_parts.append(code_text)
-            
-            if not code_parts:
-                return None
-            
-            # Combine code blocks
-            code = '\n\n##############################################################################\n# \n\n'.join(code_parts)
-            
-            # Extract dependencies
-            dependencies = self._extract_dependencies(code)
-            
-            # Determine category
-            category = self._extract_category_from_url(url)
+        """Extract code example from an nbsphinx-generated page
+        
+        nbsphinx publishes each source notebook next to its rendered page, so
+        the .ipynb is read first; the HTML is only parsed when it is missing.
+        """
+        example = await self._extract_notebook_source(package, url)
+        if example:
+            return example
+        
+        content = await self._fetch_text(url)
+        if not content:
+            return None
+        tree = lxml.html.document_fromstring(content)
+        
+        # Extract title
+        title_elem = tree.find('.//h1')
+        title = title_elem.text_content().strip() if title_elem is not None else "Untitled Notebook"
+        
+        # Extract description from first text paragraph
+        description = ""
+        for p in tree.iterfind('.//p'):
+            text = p.text_content()
+            stripped = text.strip()
+            if stripped and not text.startswith('This page was generated'):
+                description = stripped
+                break
+        
+        # Extract code cells
+        code_elems = _NOTEBOOK_CELL_CODE_XPATH(tree) or _NOTEBOOK_INPUT_CODE_XPATH(tree)
+        code_parts = []
+        for code_elem in code_elems:
+            code_text = code_elem.text_content().strip()
+            if code_text and not code_text.startswith('['):  # Skip output cells
+                code_parts.append(code_text)
+        
+        if not code_parts:
+            return None
+        
+        return self._notebook_code_example(package, url, title, description, code_parts)
+    
+    async def _extract_notebook_source(self, package: PackageInfo, url: str) -> Optional[CodeExample]:
+        """Extract code example from the .ipynb published beside a rendered page"""
+        content = await self._fetch_text(url[:-len('.html')] + '.ipynb')
+        if not content:
+            return None
+        try:
+            notebook = _json_loads(content)
+        except ValueError:
+            return None
+        
+        # Title is the first markdown heading, description the first other line
+        title = None
+        description = ""
+        code_parts = []
+        for cell in notebook.get('cells', []):
+            source = cell.get('source', '')
+            if not isinstance(source, str):
+                source = ''.join(source)
             
-            return CodeExample(
-                title=title,
-                description=description,
-                code=code,
-                package=package.name,
-                source_url=url,
-                category=category,
-                dependencies=dependencies,
-                plots_generated=True,
-                last_updated=datetime.now().isoformat()
-            )
+            if cell.get('cell_type') == 'code':
+                source = source.strip()
+                if source:
+                    code_parts.append(source)
+            elif cell.get('cell_type') == 'markdown':
+                for line in source.splitlines():
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if line.startswith('#'):
+                        if title is None:
+                            title = line.lstrip('#').strip()
+                    elif not description:
+                        description = line
+        
+        if not code_parts:
+            return None
+        
+        return self._notebook_code_example(package, url, title or "Untitled Notebook",
+                                           description, code_parts)
+    
+    def _notebook_code_example(self, package: PackageInfo, url: str, title: str,
+                               description: str, code_parts: List[str]) -> CodeExample:
+        # Combine code blocks
+        code = '\n\n##############################################################################\n# \n\n'.join(code_parts)
+        
+        # Extract dependencies
+        dependencies = self._extract_dependencies(code)
+        
+        # Determine category
+        category = self._extract_category_from_url(url)
+        
+        return CodeExample(
+            title=title,
+            description=description,
+            code=code,
+            package=package.name,
+            source_url=url,
+            category=category,
+            dependencies=dependencies,
+            plots_generated=True,
+            last_updated=datetime.now().isoformat()
+        )
     
     async def _scrape_sphinx_docs(self, package: PackageInfo) -> List[CodeExample]:
         """Scrape regular Sphinx documentation for code examples"""
@@ -366,36 +671,35 @@ class DocumentationScraper:
         main_page = f"{package.docs_url}/en/latest/"
         
         try:
-            async with self.session.get(main_page) as response:
-                if response.status != 200:
-                    return []
-                
-                content = await response.text()
-                soup = BeautifulSoup(content, 'html.parser')
+            content = await self._fetch_text(main_page, max_age=self.INDEX_PAGE_TTL)
+            if content is None:
+                return []
+            
+            soup = BeautifulSoup(content, 'lxml')
+            
+            # Look for code blocks in the documentation
+            code_blocks = soup.find_all('div', class_='highlight-python')
+            if code_blocks:
+                # Extract a simple example from the main page
+                first_block = code_blocks[0]
+                code_elem = first_block.find('code')
                 
-                # Look for code blocks in the documentation
-                code_blocks = soup.find_all('div', class_='highlight-python')
-                if code_blocks:
-                    # Extract a simple example from the main page
-                    first_block = code_blocks[0]
-                    code_elem = first_block.find('code')
+                if code_elem:
+                    code = code_elem.text.strip()
+                    dependencies = self._extract_dependencies(code)
                     
-                    if code_elem:
-                        code = code_elem.text.strip()
-                        dependencies = self._extract_dependencies(code)
-                        
-                        example = CodeExample(
-                            title=f"{package.name.title()} Basic Example",
-                            description=f"Basic usage example from {package.name} documentation",
-                            code=code,
-                            package=package.name,
-                            source_url=main_page,
-                            category="basic",
-                            dependencies=dependencies,
-                            plots_generated=False,
-                            last_updated=datetime.now().isoformat()
-                        )
-                        examples.append(example)
+                    example = CodeExample(
+                        title=f"{package.name.title()} Basic Example",
+                        description=f"Basic usage example from {package.name} documentation",
+                        code=code,
+                        package=package.name,
+                        source_url=main_page,
+                        category="basic",
+                        dependencies=dependencies,
+                        plots_generated=False,
+                        last_updated=datetime.now().isoformat()
+                    )
+                    examples.append(example)
         
         except Exception as e:
             self.logger.error(f"Failed to scrape Sphinx docs for {package.name}: {e}")
@@ -404,91 +708,48 @@ class DocumentationScraper:
     
     def _extract_dependencies(self, code: str) -> List[str]:
         """Extract package dependencies from import statements"""
-        dependencies = set()
-        
-        # Find import statements
-        import_pattern = r'^(?:from\s+(\S+)|import\s+(\S+))'
-        lines = code.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            match = re.match(import_pattern, line)
-            if match:
-                package = match.group(1) or match.group(2)
-                if package:
-                    # Get the top-level package name
-                    base_package = package.split('.')[0]
-                    dependencies.add(base_package)
-        
-        return sorted(list(dependencies))
+        # Top-level package name of every import statement, in one pass
+        return sorted({
+            (match.group(1) or match.group(2)).partition('.')[0]
+            for match in _IMPORT_RE.finditer(code)
+        })
     
     def _extract_category_from_url(self, url: str) -> str:
         """Extract category from URL path"""
-        path = urlparse(url).path
-        
-        # Common category mappings
-        if 'map' in path.lower():
-            return 'maps'
-        elif 'time' in path.lower():
-            return 'time_series'
-        elif 'plot' in path.lower():
-            return 'plotting'
-        elif 'data' in path.lower():
-            return 'data_acquisition'
-        elif 'coord' in path.lower():
-            return 'coordinates'
-        elif 'getting_started' in path.lower():
-            return 'basic'
-        elif 'diagnostic' in path.lower():
-            return 'diagnostics'
-        else:
-            return 'general'
+        return _category_for_url(url)
     
     async def save_examples(self, examples: List[CodeExample]):
-        """Save scraped examples to files"""
-        for i, example in enumerate(examples):
-            filename = f"{example.package}_{i+1:03d}_{self._sanitize_filename(example.title)}.py"
-            filepath = self.output_dir / filename
-            
-            # Generate gallery-format content
-            gallery_content = self._format_for_gallery(example)
-            
-            async with aiofiles.open(filepath, 'w') as f:
-                await f.write(gallery_content)
-            
-            self.logger.info(f"Saved: {filepath}")
+        """Save scraped examples to files, writing them concurrently"""
+        await asyncio.gather(*(self._write_one(i, example) for i, example in enumerate(examples)))
+    
+    async def _write_one(self, i: int, example: CodeExample):
+        filename = f"{example.package}_{i+1:03d}_{self._sanitize_filename(example.title)}.py"
+        filepath = self.output_dir / filename
+        
+        # Generate gallery-format content
+        gallery_content = self._format_for_gallery(example)
+        
+        async with aiofiles.open(filepath, 'w') as f:
+            await f.write(gallery_content)
+        
+        self.logger.info(f"Saved: {filepath}")
     
     def _sanitize_filename(self, title: str) -> str:
         """Convert title to safe filename"""
         # Remove special characters and replace spaces with underscores
-        sanitized = re.sub(r'[^a-zA-Z0-9\s]', '', title)
-        return re.sub(r'\s+', '_', sanitized).lower()[:50]
+        return _FILENAME_SPACE_RE.sub('_', _FILENAME_STRIP_RE.sub('', title)).lower()[:50]
     
     def _format_for_gallery(self, example: CodeExample) -> str:
         """Format example for PyHC gallery"""
         # Create gallery-compatible header
-        title_line = "=" * max(len(example.title) + 4, 40)
-        
-        header = f'''# coding: utf-8
-"""
-{title_line}
-{example.title}
-{title_line}
-
-{example.description}
-
-This example was automatically scraped from {example.package} documentation.
-Source: {example.source_url}
-
-Dependencies: {', '.join(example.dependencies)}
-"""
-
-##############################################################################
-# This example demonstrates {example.package} functionality
-#
-# Auto-generated from: {example.source_url}
-
-'''
+        header = _GALLERY_HEADER_TEMPLATE.format_map({
+            'title_line': "=" * max(len(example.title) + 4, 40),
+            'title': example.title,
+            'description': example.description,
+            'package': example.package,
+            'source_url': example.source_url,
+            'dependencies': ', '.join(example.dependencies),
+        })
         
         # Add the actual code
         return header + example.code
@@ -515,7 +776,7 @@ class LLMExampleProcessor:
 
 async def main():
     """Main scraping workflow"""
-    async with DocumentationScraper() as scraper:
+    async with DocumentationScraper(cache_dir=".scrape_cache") as scraper:
         examples = await scraper.scrape_all_packages()
         await scraper.save_examples(examples)
         
@@ -5,22 +5,55 @@ Quick Demo of PyHC Gallery System
 This creates a simple demonstration that you can view in your browser
 """
 
+from __future__ import annotations
+
+import gzip
 import os
-import webbrowser
-import http.server
-import socketserver
-import threading
+import re
 import time
 from pathlib import Path
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-def create_demo_gallery():
-    """Create a quick demo gallery"""
-    gallery_dir = Path("demo_gallery")
-    gallery_dir.mkdir(exist_ok=True)
-    
-    # Create demo HTML page
-    html_content = """<!DOCTYPE html>
+# Pre-compressed variants written next to each page, in order of preference
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _accepted_encodings(header):
+    """Return the content codings a client accepts (q > 0)"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and params[2:].strip('0.') == '':
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+# Requests served on one keep-alive connection before it is closed so a
+# long-lived browser connection cannot hold a pool worker indefinitely
+KEEPALIVE_REQUESTS = 100
+
+
+# Blocks whose whitespace is content, left untouched by _minify_html
+_VERBATIM_RE = re.compile(r'(<pre\b.*?</pre>|<div class="code">.*?</div>)', re.S)
+_LINE_BREAK_RE = re.compile(r'[ \t]*\n\s*')
+
+
+def _minify_html(html):
+    """Strip indentation and blank lines outside verbatim blocks"""
+    parts = _VERBATIM_RE.split(html)
+    # split() puts the captured verbatim blocks at the odd indices
+    parts[::2] = [_LINE_BREAK_RE.sub('\n', part) for part in parts[::2]]
+    return ''.join(parts)
+
+
+# Demo page, minified and encoded once at import and written verbatim
+_DEMO_HTML = _minify_html('''<!DOCTYPE html>
 <html>
 <head>
     <title>PyHC Gallery Automation Demo</title>
@@ -424,24 +457,121 @@ plt.show()</div>
         });
     </script>
 </body>
-</html>"""
+</html>''').encode('utf-8')
+
+
+def create_demo_gallery():
+    """Create a quick demo gallery"""
+    gallery_dir = Path("demo_gallery")
+    gallery_dir.mkdir(exist_ok=True)
     
-    with open(gallery_dir / "index.html", 'w') as f:
-        f.write(html_content)
+    # Create demo HTML page
+    with open(gallery_dir / "index.html", 'wb') as f:
+        f.write(_DEMO_HTML)
+    
+    # Compress once here so the server never spends CPU per request
+    (gallery_dir / "index.html.gz").write_bytes(gzip.compress(_DEMO_HTML, 9, mtime=0))
+    if brotli is not None:
+        (gallery_dir / "index.html.br").write_bytes(brotli.compress(_DEMO_HTML))
+    else:
+        (gallery_dir / "index.html.br").unlink(missing_ok=True)
     
     return gallery_dir
 
 
 def serve_demo(gallery_dir, port=8000):
-    """Serve the demo gallery"""
-    os.chdir(gallery_dir)
+    """Serve the demo gallery; returns the running server, or None on failure"""
+    # Imported here so building the demo page doesn't pay for the server stack
+    import email.utils
+    import hmac
+    import http.server
+    import threading
+    import webbrowser
+    from functools import partial
+    
+    from gallery_server import PooledHTTPServer
     
     class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Set TCP_NODELAY so small responses aren't held back by Nagle
+        disable_nagle_algorithm = True
+        # Drop idle keep-alive connections so they release their worker
+        timeout = 5
+        
         def log_message(self, format, *args):
             pass
+        
+        def send_response(self, code, message=None):
+            super().send_response(code, message)
+            self._served = getattr(self, '_served', 0) + 1
+            if self._served >= KEEPALIVE_REQUESTS:
+                self.send_header("Connection", "close")
+        
+        def copyfile(self, source, outputfile):
+            # Let the kernel copy the file to the socket (os.sendfile where
+            # available) instead of reading it through Python buffers
+            self.connection.sendfile(source)
+        
+        def send_head(self):
+            path = self.translate_path(self.path)
+            if os.path.isdir(path) and self.path.split('?', 1)[0].endswith('/'):
+                path = os.path.join(path, 'index.html')
+            if not os.path.isfile(path):
+                # Redirects, directory listings and 404s
+                return super().send_head()
+            
+            accepted = _accepted_encodings(self.headers.get('Accept-Encoding', ''))
+            coding, suffix = next(
+                ((c, sfx) for c, sfx in _PRECOMPRESSED
+                 if c in accepted and os.path.isfile(path + sfx)),
+                (None, ""))
+            
+            f = open(path + suffix, 'rb')
+            try:
+                fs = os.fstat(f.fileno())
+                etag = f'W/"{fs.st_mtime_ns:x}-{fs.st_size:x}"'
+                not_modified = self._not_modified(etag, fs.st_mtime)
+                self.send_response(304 if not_modified else 200)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", self.date_time_string(fs.st_mtime))
+                self.send_header("Vary", "Accept-Encoding")
+                if not_modified:
+                    f.close()
+                    self.end_headers()
+                    return None
+                self.send_header("Content-Type", self.guess_type(path))
+                if coding:
+                    self.send_header("Content-Encoding", coding)
+                self.send_header("Content-Length", str(fs.st_size))
+                self.end_headers()
+                return f
+            except:
+                f.close()
+                raise
+        
+        def _not_modified(self, etag, mtime):
+            """Check the conditional request headers against the file"""
+            if_none_match = self.headers.get('If-None-Match')
+            if if_none_match is not None:
+                # If-None-Match takes precedence; compare weakly
+                opaque = etag.removeprefix('W/').encode()
+                return any(
+                    tag == '*' or hmac.compare_digest(tag.removeprefix('W/').encode(), opaque)
+                    for tag in (t.strip() for t in if_none_match.split(',')))
+            
+            if_modified_since = self.headers.get('If-Modified-Since')
+            if if_modified_since is not None:
+                try:
+                    since = email.utils.parsedate_to_datetime(if_modified_since)
+                except (TypeError, ValueError, IndexError, OverflowError):
+                    return False
+                if since.tzinfo is not None:
+                    return int(mtime) <= since.timestamp()
+            return False
     
     try:
-        httpd = socketserver.TCPServer(("", port), QuietHTTPRequestHandler)
+        httpd = PooledHTTPServer(
+            ("", port), partial(QuietHTTPRequestHandler, directory=str(gallery_dir)))
         
         def serve():
             print(f"🌐 Demo gallery running at http://localhost:{port}")
@@ -455,10 +585,10 @@ def serve_demo(gallery_dir, port=8000):
         time.sleep(0.5)
         webbrowser.open(f"http://localhost:{port}")
         
-        return True
+        return httpd
         
     except OSError:
-        return False
+        return None
 
 
 def main():
@@ -473,7 +603,8 @@ def main():
     
     # Serve gallery
     print("Starting web server...")
-    if serve_demo(gallery_dir):
+    httpd = serve_demo(gallery_dir)
+    if httpd:
         print("🎉 Demo gallery is now running in your browser!")
         print("\nWhat you're seeing:")
         print("• Complete overview of the automation system")
@@ -481,11 +612,20 @@ def main():
         print("• Workflow visualization")
         print("• Ready-to-deploy system architecture")
         
+        # Sleep until Ctrl+C, then stop the server thread. Windows has no
+        # signal.pause(), so there it falls back to a 1s sleep loop
+        import signal
         try:
-            while True:
-                time.sleep(1)
+            if hasattr(signal, 'pause'):
+                signal.pause()
+            else:
+                while True:
+                    time.sleep(1)
         except KeyboardInterrupt:
             print("\n\n👋 Demo stopped")
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
     else:
         print("❌ Could not start web server")
 
@@ -3,13 +3,16 @@
 Setup script for PyHC Gallery Automation System
 """
 
+from pathlib import Path
+
 from setuptools import setup, find_packages
 
-with open("README.md", "r", encoding="utf-8") as fh:
-    long_description = fh.read()
+long_description = Path("README.md").read_text(encoding="utf-8")
 
-with open("requirements.txt", "r", encoding="utf-8") as fh:
-    requirements = [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+requirements = [
+    line for line in map(str.strip, Path("requirements.txt").read_text(encoding="utf-8").splitlines())
+    if line and not line.startswith("#")
+]
 
 setup(
     name="pyhc-gallery-scraper",
@@ -27,14 +30,12 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
         "Topic :: Scientific/Engineering :: Physics",
         "Topic :: Software Development :: Libraries :: Python Modules",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.10",
     install_requires=requirements,
     entry_points={
         "console_scripts": [
@@ -49,5 +50,12 @@ setup(
             "flake8>=5.0.0",
             "mypy>=0.990",
         ],
+        "speedups": [
+            "pygit2>=1.14.0",
+            "orjson>=3.9.0",
+            "h2>=4.0.0",
+            "Brotli>=1.0.9",
+            "uvloop>=0.18.0; sys_platform != 'win32'",
+        ],
     },
 )
\ No newline at end of file
@@ -9,54 +9,69 @@ import asyncio
 import logging
 import os
 import json
+import tempfile
+from collections import Counter
+from contextlib import nullcontext
 from pathlib import Path
 
 from pyhc_gallery_scraper import DocumentationScraper, PyHCPackageRegistry
-from llm_processor import BatchProcessor
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-async def test_basic_scraping():
+# Generated test artifacts are only written when asked for
+WRITE_TEST_OUTPUT = bool(os.getenv('WRITE_TEST_OUTPUT'))
+
+
+def _maybe_write(path, content, enabled=WRITE_TEST_OUTPUT):
+    """Write a test artifact (str or bytes) if enabled; return whether it was written"""
+    if not enabled:
+        return False
+    path.parent.mkdir(exist_ok=True)
+    with open(path, 'wb' if isinstance(content, bytes) else 'w') as f:
+        f.write(content)
+    return True
+
+
+def _json_dumps_indented(data):
+    """Serialize data as indented JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+async def test_basic_scraping(scraper):
     """Test basic scraping functionality"""
     print("Testing basic scraping functionality...")
     
-    # Create test output directory
-    test_output = Path("test_output")
-    test_output.mkdir(exist_ok=True)
-    
-    # Test scraping one package
-    async with DocumentationScraper(str(test_output)) as scraper:
-        # Test with SunPy (most reliable)
-        sunpy_package = None
-        for pkg in PyHCPackageRegistry.PACKAGES:
-            if pkg.name == "sunpy":
-                sunpy_package = pkg
-                break
-        
-        if sunpy_package:
-            print(f"Testing scraping of {sunpy_package.name}...")
-            examples = await scraper.scrape_package(sunpy_package)
-            print(f"Found {len(examples)} examples from {sunpy_package.name}")
-            
-            for i, example in enumerate(examples[:3]):  # Show first 3
-                print(f"\nExample {i+1}:")
-                print(f"  Title: {example.title}")
-                print(f"  Category: {example.category}")
-                print(f"  Dependencies: {example.dependencies}")
-                print(f"  Code length: {len(example.code)} characters")
-                print(f"  Source: {example.source_url}")
+    # Test with SunPy (most reliable)
+    sunpy_package = PyHCPackageRegistry.by_name("sunpy")
+    
+    if sunpy_package:
+        print(f"Testing scraping of {sunpy_package.name}...")
+        examples = await scraper.scrape_package(sunpy_package)
+        print(f"Found {len(examples)} examples from {sunpy_package.name}")
         
-        return examples if sunpy_package else []
+        for i, example in enumerate(examples[:3]):  # Show first 3
+            print(f"\nExample {i+1}:")
+            print(f"  Title: {example.title}")
+            print(f"  Category: {example.category}")
+            print(f"  Dependencies: {example.dependencies}")
+            print(f"  Code length: {len(example.code)} characters")
+            print(f"  Source: {example.source_url}")
+    
+    return examples if sunpy_package else []
 
 
 async def test_llm_processing():
-    """Test LLM processing functionality"""
+    """Test LLM processing functionality (main() only runs it with an API key)"""
     print("\nTesting LLM processing...")
     
-    # Check for API key
+    from llm_processor import BatchProcessor
+    
     api_key = os.getenv('ANTHROPIC_API_KEY')
-    if not api_key:
-        print("⚠️  ANTHROPIC_API_KEY not set - skipping LLM tests")
-        return
     
     # Create a simple test example
     test_example = {
@@ -79,8 +94,8 @@ plt.show()
     }
     
     try:
-        processor = BatchProcessor(api_key, max_concurrent=1)
-        results = await processor.process_examples([test_example])
+        async with BatchProcessor(api_key, max_concurrent=1) as processor:
+            results = await processor.process_examples([test_example])
         
         if results:
             result = results[0]
@@ -91,16 +106,14 @@ plt.show()
             print(f"   Warnings: {result.warnings}")
             
             # Save test result
-            test_output = Path("test_output")
-            with open(test_output / "llm_test_result.json", 'w') as f:
-                json.dump({
-                    'title': result.improved_title,
-                    'description': result.improved_description,
-                    'category': result.category,
-                    'confidence': result.confidence_score,
-                    'warnings': result.warnings,
-                    'notes': result.processing_notes
-                }, f, indent=2)
+            _maybe_write(Path("test_output") / "llm_test_result.json", _json_dumps_indented({
+                'title': result.improved_title,
+                'description': result.improved_description,
+                'category': result.category,
+                'confidence': result.confidence_score,
+                'warnings': result.warnings,
+                'notes': result.processing_notes
+            }))
             
             return results
         else:
@@ -155,20 +168,17 @@ plt.show()
     )
     
     # Save test gallery file
-    test_output = Path("test_output")
-    test_output.mkdir(exist_ok=True)
-    
-    with open(test_output / "test_gallery_example.py", 'w') as f:
-        f.write(gallery_content)
+    written = _maybe_write(Path("test_output") / "test_gallery_example.py", gallery_content)
     
     print("✅ Gallery format test completed")
-    print(f"   Generated file: test_output/test_gallery_example.py")
+    if written:
+        print(f"   Generated file: test_output/test_gallery_example.py")
     print(f"   Content length: {len(gallery_content)} characters")
     
     return gallery_content
 
 
-async def test_workflow_dry_run():
+async def test_workflow_dry_run(scraper=None):
     """Test the complete workflow in dry-run mode"""
     print("\nTesting complete workflow (dry run)...")
     
@@ -180,15 +190,13 @@ async def test_workflow_dry_run():
         
         # Test just the scraping part for now
         print("Testing scraping component...")
-        scraped_examples = await workflow._scrape_examples()
+        scraped_examples = await workflow._scrape_examples(scraper)
         
         print(f"✅ Workflow test completed")
         print(f"   Scraped {len(scraped_examples)} examples")
         
         # Show summary by package
-        package_counts = {}
-        for example in scraped_examples:
-            package_counts[example.package] = package_counts.get(example.package, 0) + 1
+        package_counts = Counter(example.package for example in scraped_examples)
         
         print("   Examples by package:")
         for package, count in package_counts.items():
@@ -209,31 +217,48 @@ async def main():
     # Set up logging
     logging.basicConfig(level=logging.WARNING)  # Reduce noise during testing
     
-    # Test 1: Basic scraping
-    scraped_examples = await test_basic_scraping()
-    
-    # Test 2: LLM processing (if API key available)
-    await test_llm_processing()
-    
-    # Test 3: Gallery formatting
+    # Test 3: Gallery formatting (CPU only, no need to overlap it)
     test_gallery_format()
     
-    # Test 4: Workflow dry run
-    await test_workflow_dry_run()
+    # Test 2: LLM processing needs an API key
+    has_api_key = bool(os.getenv('ANTHROPIC_API_KEY'))
+    if not has_api_key:
+        print("\n⚠️  ANTHROPIC_API_KEY not set - skipping LLM tests")
+    
+    # Tests 1, 2 and 4 wait on the network, so run them concurrently:
+    # basic scraping, LLM processing, workflow dry run. The scraping tests
+    # share one scraper so they reuse its pooled connections
+    # The scraper creates its output directory, so only point it at
+    # test_output/ when artifacts are being kept
+    output_dir = nullcontext("test_output") if WRITE_TEST_OUTPUT else tempfile.TemporaryDirectory()
+    with output_dir as scraper_dir:
+        async with DocumentationScraper(scraper_dir) as scraper:
+            scraped_examples, _, _ = await asyncio.gather(
+                test_basic_scraping(scraper),
+                test_llm_processing() if has_api_key else asyncio.sleep(0),
+                test_workflow_dry_run(scraper),
+                return_exceptions=True
+            )
     
     print("\n" + "=" * 40)
     print("Test Summary:")
-    print(f"✅ Scraping test: Found {len(scraped_examples)} examples")
+    if isinstance(scraped_examples, BaseException):
+        print(f"❌ Scraping test failed: {scraped_examples}")
+    else:
+        print(f"✅ Scraping test: Found {len(scraped_examples)} examples")
     print("✅ Gallery formatting test: Completed")
     print("✅ Basic workflow test: Completed")
     
-    if os.getenv('ANTHROPIC_API_KEY'):
+    if has_api_key:
         print("✅ LLM processing test: Completed")
     else:
         print("⚠️  LLM processing test: Skipped (no API key)")
     
-    print("\nTest files saved to: test_output/")
-    print("Review the generated files to verify output quality.")
+    if WRITE_TEST_OUTPUT:
+        print("\nTest files saved to: test_output/")
+        print("Review the generated files to verify output quality.")
+    else:
+        print("\nSet WRITE_TEST_OUTPUT=1 to save the generated files to test_output/")
 
 
 if __name__ == "__main__":